@@ -0,0 +1,175 @@
+# Generator data sintetis untuk benchmark offline.
+#
+# Menghasilkan input yang bentuknya sama dengan data asli:
+#   - file JSON laporan keuangan IDX (field "emiten" + tag map "laporan_keuangan")
+#   - deret OHLC harian multi-tahun untuk N ticker (kolom seperti hasil yfinance)
+#   - artikel berita berbahasa Indonesia gaya IQPlus, termasuk sebagian terbitan ulang
+#
+# Contoh:
+#   python generate_data.py --filings 500 --tickers 50 --years 5 --articles 1000 --out synthetic
+
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Tag yang dipakai oleh spark_transform_direct.py, langsung dari loader agar selalu sama
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script IDX"))
+from filing_store import MAPPED_TAGS
+
+SECTORS = ["Energy", "Basic Materials", "Industrials", "Consumer Non-Cyclicals", "Consumer Cyclicals",
+           "Healthcare", "Financials", "Properties & Real Estate", "Technology", "Infrastructures",
+           "Transportation & Logistic"]
+COMPANY_WORDS = ["Adaro", "Astra", "Mahaka", "Sinar", "Mitra", "Bumi", "Jaya", "Sentosa", "Makmur",
+                 "Nusantara", "Indah", "Prima", "Global", "Karya", "Abadi", "Utama", "Sejahtera"]
+
+
+def _company_name(rng, idx):
+    return f"PT {rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_WORDS)} {idx} Tbk"
+
+
+def _amount(rng, scale):
+    return f"{rng.uniform(0.05, 1.0) * scale:.1f}"
+
+
+# Fungsi membuat satu filing; extra_tags meniru ratusan tag XBRL lain yang tidak dipakai transform
+def generate_filing(rng, idx, extra_tags=300):
+    scale = 10 ** rng.randint(9, 14)
+    lk = {
+        "EntityName": _company_name(rng, idx),
+        "Sector": rng.choice(SECTORS),
+        "CurrentPeriodEndDate": f"{rng.choice([2021, 2022, 2023, 2024])}-12-31",
+    }
+    assets = float(_amount(rng, scale * 5))
+    equity = assets * rng.uniform(0.2, 0.8)
+    revenue = float(_amount(rng, scale * 2))
+    lk.update({
+        "SalesAndRevenue": f"{revenue:.1f}",
+        "GrossProfit": f"{revenue * rng.uniform(0.1, 0.5):.1f}",
+        "ProfitLoss": f"{revenue * rng.uniform(-0.1, 0.25):.1f}",
+        "ProfitLossBeforeIncomeTax": f"{revenue * rng.uniform(-0.1, 0.3):.1f}",
+        "CashAndCashEquivalents": f"{assets * rng.uniform(0.02, 0.3):.1f}",
+        "Assets": f"{assets:.1f}",
+        "Equity": f"{equity:.1f}",
+        "ShortTermLoans": f"{assets * rng.uniform(0, 0.1):.1f}" if rng.random() < 0.7 else None,
+        "LongTermBankLoans": f"{assets * rng.uniform(0, 0.2):.1f}",
+        "NetCashFlowsReceivedFromUsedInOperatingActivities": f"{revenue * rng.uniform(-0.05, 0.2):.1f}",
+        "NetCashFlowsReceivedFromUsedInInvestingActivities": f"{-revenue * rng.uniform(0, 0.15):.1f}",
+        "NetCashFlowsReceivedFromUsedInFinancingActivities": f"{revenue * rng.uniform(-0.1, 0.1):.1f}",
+    })
+    # Tag lain yang dibaca loader (mis. tag alternatif) ikut diisi agar semua tag tercakup
+    for tag in MAPPED_TAGS:
+        lk.setdefault(tag, _amount(rng, scale))
+    for tag_idx in range(extra_tags):
+        lk[f"OtherFinancialTag{tag_idx}"] = _amount(rng, scale)
+    return {"emiten": lk["EntityName"], "laporan_keuangan": lk}
+
+
+def generate_filings(n, out_dir, seed=42, extra_tags=300):
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    for idx in range(n):
+        path = os.path.join(out_dir, f"instance_synthetic_{idx:05d}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(generate_filing(rng, idx, extra_tags), f)
+    return out_dir
+
+
+# Fungsi membuat deret OHLC harian (hari bursa) dengan random walk geometris
+def generate_ohlc(ticker, years=5, seed=0, end=None):
+    rng = np.random.RandomState(seed)
+    end = end or datetime(2025, 1, 1)
+    dates = pd.bdate_range(end - timedelta(days=365 * years), end)
+    returns = rng.normal(0.0003, 0.02, len(dates))
+    close = 1000 * np.exp(np.cumsum(returns))
+    open_ = close * np.exp(rng.normal(0, 0.005, len(dates)))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, len(dates))))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, len(dates))))
+    return pd.DataFrame({
+        "Date": dates,
+        "Open": open_.round(0),
+        "High": high.round(0),
+        "Low": low.round(0),
+        "Close": close.round(0),
+        "Adj Close": close.round(0),
+        "Volume": rng.randint(10_000, 50_000_000, len(dates)),
+        "Ticker": ticker,
+    })
+
+
+def generate_price_series(n_tickers, years=5, seed=0):
+    return {f"SYN{idx:03d}.JK": generate_ohlc(f"SYN{idx:03d}.JK", years, seed + idx) for idx in range(n_tickers)}
+
+
+SUBJECTS = ["PT Bank Rakyat Indonesia Tbk (BBRI)", "PT Telkom Indonesia Tbk (TLKM)", "PT Astra International Tbk (ASII)",
+            "Indeks Harga Saham Gabungan", "PT Bank Mandiri Tbk (BMRI)", "PT Adaro Energy Indonesia Tbk (ADRO)",
+            "Bank Indonesia", "PT Unilever Indonesia Tbk (UNVR)"]
+SENTENCES = [
+    "{s} mencatatkan laba bersih sebesar Rp{n} triliun hingga kuartal {q} tahun ini.",
+    "Kenaikan tersebut didorong oleh pertumbuhan pendapatan sebesar {p} persen secara tahunan.",
+    "Direktur Utama perseroan menyampaikan bahwa kinerja operasional tetap solid di tengah ketidakpastian global.",
+    "Investor asing mencatatkan pembelian bersih sebesar Rp{n} miliar di pasar reguler.",
+    "Analis memperkirakan harga saham masih berpotensi menguat hingga akhir tahun.",
+    "Perseroan menargetkan belanja modal sebesar Rp{n} triliun untuk ekspansi usaha.",
+    "Rasio kredit bermasalah tercatat {p} persen, lebih rendah dibandingkan periode yang sama tahun lalu.",
+    "{s} juga berencana membagikan dividen interim kepada pemegang saham.",
+    "Sentimen pasar dipengaruhi oleh rilis data inflasi dan arah suku bunga acuan.",
+    "Sektor energi dan bahan baku menjadi penekan utama pergerakan indeks hari ini.",
+    "Nilai tukar rupiah ditutup melemah {p} persen terhadap dolar AS.",
+    "Manajemen optimistis permintaan domestik akan tetap kuat pada semester kedua.",
+]
+
+
+def generate_article(rng, min_sentences=4, max_sentences=60):
+    subject = rng.choice(SUBJECTS)
+    parts = [rng.choice(SENTENCES).format(s=subject, n=rng.randint(1, 900), q=rng.randint(1, 4),
+                                          p=round(rng.uniform(0.1, 25), 1))
+             for _ in range(rng.randint(min_sentences, max_sentences))]
+    date = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}"
+    return f"IQPlus, ({date}) - " + " ".join(parts) + " (end)"
+
+
+# Fungsi membuat artikel; duplicate_ratio bagian artikel adalah terbitan ulang (sedikit diubah)
+def generate_articles(n, seed=42, duplicate_ratio=0.15):
+    rng = random.Random(seed)
+    articles = []
+    for _ in range(n):
+        if articles and rng.random() < duplicate_ratio:
+            base = rng.choice(articles)
+            articles.append(base.replace("(end)", rng.choice(SENTENCES).format(
+                s=rng.choice(SUBJECTS), n=1, q=1, p=1.0) + " (end)"))
+        else:
+            articles.append(generate_article(rng))
+    return articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generator data sintetis untuk benchmark")
+    parser.add_argument("--filings", type=int, default=200)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--articles", type=int, default=500)
+    parser.add_argument("--out", default="synthetic")
+    args = parser.parse_args()
+
+    generate_filings(args.filings, os.path.join(args.out, "downloads"))
+    print(f"✅ {args.filings} filing IDX ditulis ke {args.out}/downloads")
+
+    prices_dir = os.path.join(args.out, "prices")
+    os.makedirs(prices_dir, exist_ok=True)
+    for ticker, df in generate_price_series(args.tickers, args.years).items():
+        df.to_csv(os.path.join(prices_dir, f"{ticker}.csv"), index=False)
+    print(f"✅ {args.tickers} deret OHLC ({args.years} tahun) ditulis ke {prices_dir}")
+
+    with open(os.path.join(args.out, "articles.json"), "w", encoding="utf-8") as f:
+        json.dump([{"konten": text} for text in generate_articles(args.articles)], f, ensure_ascii=False)
+    print(f"✅ {args.articles} artikel ditulis ke {args.out}/articles.json")
+
+
+if __name__ == "__main__":
+    main()
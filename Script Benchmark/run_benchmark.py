@@ -0,0 +1,372 @@
+# Benchmark offline untuk seluruh pipeline.
+#
+# Setiap tahap dijalankan dengan data sintetis dari generate_data.py dan diukur waktunya:
+#   - resample_data_spark (yfinance)      : semua timeframe untuk N ticker
+#   - trailing_window_stats (yfinance)    : trailing window 1/3/5 tahun untuk N ticker
+#   - transform_filings (IDX)             : transformasi Spark laporan keuangan
+#   - insert_filings / insert_transformed : loader MongoDB (mongod lokal atau mongomock)
+#   - build_figure (yfinance)             : render chart Plotly ke HTML
+#   - peringkasan (IQNews)                : tahap ekstraktif, dan BART jika --model-dir diisi
+# Tahap yang dependensinya tidak tersedia (pyspark/Java, torch, ...) dilewati dengan pesan.
+#
+# Hasil setiap run ditambahkan ke file JSON-lines (default benchmark_results.jsonl) dan
+# dibandingkan dengan run sebelumnya yang memakai skala data sama, sehingga regresi langsung
+# terlihat.
+#
+# Contoh:
+#   python run_benchmark.py --mongo memory
+#   python run_benchmark.py --mongo local --filings 1000 --tickers 50
+#   python run_benchmark.py --model-dir ./bart-large-cnn --articles 100
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime
+
+import generate_data
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BASE_DIR)
+for folder in ("Script IDX", "Script yfinance", "Script IQNews", "Script Common"):
+    sys.path.insert(0, os.path.join(REPO_DIR, folder))
+
+BENCHMARK_DB = "benchmark_tmp"
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+class SkipStage(Exception):
+    """
+    Raised by a stage whose dependencies are not available in this environment
+    """
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+# Fungsi menjalankan satu tahap dan mencatat waktunya; fn mengembalikan jumlah item yang diproses
+def run_stage(results, name, fn, repeat=1):
+    print(f"\n⏱ {name}")
+    timings = []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            items = fn()
+            timings.append(time.perf_counter() - start)
+    except SkipStage as e:
+        print(f"⏭ Dilewati: {e}")
+        results[name] = {"status": "skipped", "reason": str(e)}
+        return
+    except Exception as e:
+        traceback.print_exc()
+        results[name] = {"status": "error", "error": str(e)}
+        return
+
+    best = min(timings)
+    results[name] = {
+        "status": "ok",
+        "seconds": round(best, 4),
+        "items": items,
+        "items_per_second": round(items / best, 2) if best > 0 and items else None,
+    }
+    print(f"✅ {name}: {best:.3f} detik untuk {items} item")
+
+
+def get_spark():
+    if importlib.util.find_spec("pyspark") is None:
+        raise SkipStage("pyspark tidak terpasang")
+    from spark_session import create_spark_session
+    try:
+        # Profil sama dengan pipeline (SPARK_PROFILE) agar hasil benchmark mewakili run sebenarnya
+        return create_spark_session("PipelineBenchmark", extra_config={"spark.ui.enabled": "false"})
+    except Exception as e:
+        raise SkipStage(f"Spark tidak bisa dijalankan ({e})")
+
+
+def get_mongo_db(args):
+    if args.mongo == "memory":
+        try:
+            import mongomock
+        except ImportError:
+            raise SkipStage("mongomock tidak terpasang (pip install mongomock)")
+        return mongomock.MongoClient()[BENCHMARK_DB]
+    from mongo_access import get_client
+    client = get_client(args.mongo_uri, serverSelectionTimeoutMS=3000)
+    try:
+        client.server_info()
+    except Exception as e:
+        raise SkipStage(f"MongoDB tidak bisa dihubungi ({e})")
+    return client[BENCHMARK_DB]
+
+
+def bench_resample(price_series):
+    def stage():
+        try:
+            from stock_to_spark import resample_data_spark
+        except ImportError as e:
+            raise SkipStage(f"stock_to_spark tidak bisa diimport ({e})")
+        spark = get_spark()
+        rows = 0
+        for ticker, pd_df in price_series.items():
+            spark_df = spark.createDataFrame(pd_df)
+            for timeframe in ["daily", "weekly", "monthly", "yearly"]:
+                resampled = resample_data_spark(spark_df, ticker, timeframe)
+                if resampled is not None:
+                    rows += resampled.count()
+        return rows
+    return stage
+
+
+def bench_trailing_windows(price_series):
+    def stage():
+        from rolling_windows import HORIZONS, trailing_window_stats
+        rows = 0
+        for pd_df in price_series.values():
+            for years in HORIZONS.values():
+                rows += len(trailing_window_stats(pd_df, years))
+        return rows
+    return stage
+
+
+def bench_idx_transform(filings_dir, transformed_path):
+    def stage():
+        try:
+            from spark_transform_direct import load_filings, transform_filings
+        except ImportError as e:
+            raise SkipStage(f"spark_transform_direct tidak bisa diimport ({e})")
+        spark = get_spark()
+        json_files = [f for f in os.listdir(filings_dir) if f.endswith(".json")]
+        transformed_df = transform_filings(spark, load_filings(filings_dir, json_files))
+        records = [row.asDict() for row in transformed_df.collect()]
+        with open(transformed_path, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+        return len(records)
+    return stage
+
+
+def _write_transformed_fallback(filings_dir, transformed_path):
+    # Tanpa Spark, loader data_terstruktur tetap diuji dengan dokumen berisi tag yang dipetakan saja
+    records = []
+    for json_file in sorted(os.listdir(filings_dir)):
+        with open(os.path.join(filings_dir, json_file), "r", encoding="utf-8") as f:
+            lk = json.load(f)["laporan_keuangan"]
+        record = {tag: lk.get(tag) for tag in generate_data.MAPPED_TAGS}
+        record.update({"nama": lk.get("EntityName"), "source_file": json_file})
+        records.append(record)
+    with open(transformed_path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+
+
+def bench_insert_filings(args, filings_dir):
+    def stage():
+        from insert_to_mongodb import insert_filings
+        collection = get_mongo_db(args)["laporan_tahunan"]
+        collection.drop()
+        try:
+            return insert_filings(collection, filings_dir)
+        finally:
+            collection.drop()
+    return stage
+
+
+def bench_insert_filings_compact(args, filings_dir):
+    def stage():
+        from filing_store import COMPACT_COLLECTION, TAG_INDEX_COLLECTION
+        from insert_to_mongodb import insert_filings
+        db = get_mongo_db(args)
+        collection, tag_index = db[COMPACT_COLLECTION], db[TAG_INDEX_COLLECTION]
+        collection.drop()
+        tag_index.drop()
+        try:
+            return insert_filings(collection, filings_dir, tag_index=tag_index)
+        finally:
+            collection.drop()
+            tag_index.drop()
+    return stage
+
+
+def bench_insert_transformed(args, filings_dir, transformed_path):
+    def stage():
+        from insert_transformed_to_mongo import insert_transformed
+        if not os.path.exists(transformed_path):
+            _write_transformed_fallback(filings_dir, transformed_path)
+        collection = get_mongo_db(args)["data_terstruktur"]
+        collection.drop()
+        try:
+            return insert_transformed(collection, transformed_path)
+        finally:
+            collection.drop()
+    return stage
+
+
+def bench_charts(price_series, html_dir):
+    def stage():
+        try:
+            from plot_stock_data import build_figure
+        except ImportError as e:
+            raise SkipStage(f"plot_stock_data tidak bisa diimport ({e})")
+        charts = 0
+        for ticker, pd_df in price_series.items():
+            df = pd_df.rename(columns=str.lower).tail(365).reset_index(drop=True)
+            fig = build_figure(df, ticker, "daily")
+            fig.write_html(os.path.join(html_dir, f"{ticker}_daily.html"))
+            charts += 1
+        return charts
+    return stage
+
+
+def bench_extractive(articles, method, budget):
+    def stage():
+        from rangkum_ekstraktif import select_sentences
+        for text in articles:
+            sentences = [s for s in SENTENCE_SPLIT.split(text) if s.strip()]
+            if sentences:
+                # Panjang kalimat dihitung per kata sebagai pengganti token BART
+                select_sentences(sentences, [len(s.split()) for s in sentences], budget, method)
+        return len(articles)
+    return stage
+
+
+def bench_summarize(articles, args):
+    def stage():
+        if not args.model_dir:
+            raise SkipStage("--model-dir tidak diisi")
+        try:
+            from rangkum_backend import load_summarizer
+            from rangkum_utils import LocalEngine, clean_text
+        except ImportError as e:
+            raise SkipStage(f"dependensi peringkasan tidak tersedia ({e})")
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        summarizer, tokenizer = load_summarizer(args.backend, args.model_dir, args.threads)
+        engine = LocalEngine(summarizer, tokenizer, args.inference_batch_size, extractive="textrank")
+        engine.summarize([engine.prepare(clean_text(text)) for text in articles])
+        return len(articles)
+    return stage
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# Fungsi membandingkan hasil dengan run sebelumnya pada skala data yang sama
+def compare(entry, history, threshold, min_delta=0.05):
+    previous = [h for h in history if h.get("scale") == entry["scale"] and h.get("mongo") == entry["mongo"]]
+    if not previous:
+        print("\nℹ Belum ada run sebelumnya dengan skala yang sama untuk dibandingkan.")
+        return []
+    baseline = previous[-1]
+    print(f"\n📊 Dibandingkan dengan run {baseline['timestamp']} (commit {baseline.get('commit')})")
+    regressions = []
+    for name, result in entry["stages"].items():
+        before = baseline["stages"].get(name, {})
+        if result.get("status") != "ok" or before.get("status") != "ok":
+            continue
+        change = (result["seconds"] - before["seconds"]) / before["seconds"] * 100 if before["seconds"] else 0.0
+        # Selisih absolut kecil diabaikan agar noise pada tahap yang sangat cepat tidak dianggap regresi
+        regressed = change > threshold and result["seconds"] - before["seconds"] > min_delta
+        flag = "⚠ REGRESI" if regressed else ""
+        print(f"   {name:<28} {before['seconds']:>9.3f}s -> {result['seconds']:>9.3f}s ({change:+.1f}%) {flag}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark offline pipeline IDX, yfinance, dan IQNews")
+    parser.add_argument("--filings", type=int, default=200)
+    parser.add_argument("--extra-tags", type=int, default=300, help="Jumlah tag XBRL tambahan per filing")
+    parser.add_argument("--tickers", type=int, default=10)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--mongo", default="memory", choices=["memory", "local"],
+                        help="'memory' memakai mongomock, 'local' memakai --mongo-uri")
+    parser.add_argument("--mongo-uri", default=os.environ.get("MONGO_URI", "mongodb://localhost:27017/"))
+    parser.add_argument("--stages", default=None,
+                        help="Daftar tahap dipisah koma (default: semua)")
+    parser.add_argument("--repeat", type=int, default=1, help="Ulangi setiap tahap, ambil waktu terbaik")
+    parser.add_argument("--extractive", default="textrank", choices=["textrank", "tfidf"])
+    parser.add_argument("--extractive-budget", type=int, default=300)
+    parser.add_argument("--model-dir", default=None, help="Direktori model lokal untuk tahap BART")
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--inference-batch-size", type=int, default=8)
+    parser.add_argument("--output", default=os.path.join(BASE_DIR, "benchmark_results.jsonl"))
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="Persentase perlambatan yang dianggap regresi")
+    parser.add_argument("--min-delta", type=float, default=0.05,
+                        help="Selisih minimum (detik) agar perlambatan dihitung sebagai regresi")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="pipeline_benchmark_")
+    filings_dir = os.path.join(workdir, "downloads")
+    transformed_path = os.path.join(workdir, "transformed_financial_data.json")
+    html_dir = os.path.join(workdir, "charts")
+    os.makedirs(html_dir, exist_ok=True)
+
+    print(f"🧪 Menyiapkan data sintetis di {workdir}")
+    generate_data.generate_filings(args.filings, filings_dir, extra_tags=args.extra_tags)
+    price_series = generate_data.generate_price_series(args.tickers, args.years)
+    articles = generate_data.generate_articles(args.articles)
+
+    stages = {
+        "resample_data_spark": bench_resample(price_series),
+        "trailing_windows": bench_trailing_windows(price_series),
+        "idx_transform": bench_idx_transform(filings_dir, transformed_path),
+        "insert_filings": bench_insert_filings(args, filings_dir),
+        "insert_filings_compact": bench_insert_filings_compact(args, filings_dir),
+        "insert_transformed": bench_insert_transformed(args, filings_dir, transformed_path),
+        "chart_render": bench_charts(price_series, html_dir),
+        "summarize_extractive": bench_extractive(articles, args.extractive, args.extractive_budget),
+        "summarize_model": bench_summarize(articles, args),
+    }
+    selected = args.stages.split(",") if args.stages else list(stages)
+    unknown = [name for name in selected if name not in stages]
+    if unknown:
+        raise SystemExit(f"❌ Tahap tidak dikenal: {', '.join(unknown)} (pilihan: {', '.join(stages)})")
+
+    results = {}
+    for name in selected:
+        run_stage(results, name, stages[name], args.repeat)
+
+    entry = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "mongo": args.mongo,
+        "scale": {"filings": args.filings, "extra_tags": args.extra_tags, "tickers": args.tickers,
+                  "years": args.years, "articles": args.articles},
+        "stages": results,
+    }
+    history = load_history(args.output)
+    regressions = compare(entry, history, args.threshold, args.min_delta)
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"\n💾 Hasil disimpan ke {args.output}")
+
+    if regressions:
+        print(f"⚠ Regresi terdeteksi pada: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
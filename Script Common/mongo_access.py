@@ -0,0 +1,240 @@
+# Akses MongoDB bersama untuk semua loader dan reader.
+#
+# Semua skrip mengambil client dari sini, sehingga tuning throughput cukup di satu tempat:
+#   - client dengan connection pool, kompresi wire (zstd/snappy/zlib sesuai library yang
+#     terpasang), retryable writes/reads, dan write concern yang bisa diatur
+#   - BulkWriter: penulisan batch unordered (insert / upsert / update) dengan retry untuk
+#     error jaringan dan error transien
+#   - find_batched: cursor dengan batch_size, projection, sort, dan limit
+#   - SPARK_WRITE_OPTIONS: opsi write yang setara untuk MongoDB Spark connector
+#
+# Konfigurasi lewat environment:
+#   MONGO_URI            : default mongodb://localhost:27017/
+#   MONGO_MAX_POOL_SIZE  : default 50
+#   MONGO_COMPRESSORS    : default "zstd,snappy,zlib" (yang tidak terpasang dilewati)
+#   MONGO_WRITE_CONCERN  : w untuk write concern (default 1; mis. "majority")
+#   MONGO_BATCH_SIZE     : ukuran batch cursor dan bulk write (default 1000)
+#
+# Contoh:
+#   from mongo_access import BulkWriter, find_batched, get_db
+#   db = get_db("idx_tugas2")
+#   with BulkWriter(db["data_terstruktur"]) as writer:
+#       writer.upsert({"source_file": doc["source_file"]}, doc)
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+from pymongo import InsertOne, MongoClient, ReplaceOne, UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError, ConnectionFailure, NetworkTimeout
+from pymongo.write_concern import WriteConcern
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "50"))
+COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+WRITE_CONCERN_W = os.environ.get("MONGO_WRITE_CONCERN", "1")
+BATCH_SIZE = int(os.environ.get("MONGO_BATCH_SIZE", "1000"))
+
+# Error yang aman untuk diulang: masalah jaringan, failover primary, dan batas waktu
+RETRYABLE_ERRORS = (AutoReconnect, ConnectionFailure, NetworkTimeout)
+RETRYABLE_WRITE_CODES = {6, 7, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+# Operator update yang aman diterapkan dua kali (hasilnya sama)
+IDEMPOTENT_UPDATE_OPERATORS = {"$set", "$setOnInsert", "$unset"}
+DUPLICATE_KEY_CODE = 11000
+
+# Opsi write MongoDB Spark connector yang setara dengan BulkWriter
+SPARK_WRITE_OPTIONS = {
+    "ordered": "false",
+    "maxBatchSize": str(BATCH_SIZE),
+    "writeConcern.w": WRITE_CONCERN_W,
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _write_concern_w(value=WRITE_CONCERN_W):
+    return int(value) if str(value).isdigit() else value
+
+
+# Kompresor zstd dan snappy butuh library tambahan (zstandard, python-snappy); zlib selalu ada
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def available_compressors(requested=COMPRESSORS):
+    names = [c.strip() for c in requested.split(",") if c.strip()]
+    return [name for name in names
+            if name in COMPRESSOR_MODULES and importlib.util.find_spec(COMPRESSOR_MODULES[name]) is not None]
+
+
+def get_client(uri=None, **overrides):
+    """
+    Return a pooled MongoClient shared by everything in this process for the same settings
+    """
+    uri = uri or MONGO_URI
+    key = (uri, tuple(sorted(overrides.items())))
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            options = {
+                "maxPoolSize": MAX_POOL_SIZE,
+                "minPoolSize": 0,
+                "maxIdleTimeMS": 60_000,
+                "retryWrites": True,
+                "retryReads": True,
+                "w": _write_concern_w(),
+                "serverSelectionTimeoutMS": 10_000,
+                "appname": os.path.basename(sys.argv[0]) or "pipeline",
+            }
+            compressors = available_compressors()
+            if compressors:
+                options["compressors"] = ",".join(compressors)
+            options.update(overrides)
+            client = _clients[key] = MongoClient(uri, **options)
+        return client
+
+
+def get_db(name, uri=None, **overrides):
+    return get_client(uri, **overrides)[name]
+
+
+# Fungsi membuat URI dengan nama database (mis. untuk spark.mongodb.output.uri) dari MONGO_URI,
+# dengan opsi query string tetap dipertahankan
+def database_uri(name, uri=None):
+    base, _, query = (uri or MONGO_URI).partition("?")
+    scheme, _, rest = base.partition("://")
+    hosts = rest.split("/", 1)[0]
+    return f"{scheme}://{hosts}/{name}" + (f"?{query}" if query else "")
+
+
+def with_write_concern(collection, w=None, journal=None):
+    return collection.with_options(write_concern=WriteConcern(w=_write_concern_w(w or WRITE_CONCERN_W), j=journal))
+
+
+def close_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+# Fungsi cursor dengan batch size dan projection; sort berupa list [(field, arah)]
+def find_batched(collection, query=None, projection=None, batch_size=BATCH_SIZE, sort=None, limit=0):
+    cursor = collection.find(query or {}, projection, batch_size=batch_size)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+
+def _is_idempotent(op):
+    if isinstance(op, (InsertOne, ReplaceOne)):
+        return True
+    update = getattr(op, "_doc", None)
+    return isinstance(update, dict) and set(update) <= IDEMPOTENT_UPDATE_OPERATORS
+
+
+# Fungsi bulk_write unordered dengan retry. Operasi yang gagal karena error transien
+# diulang (hanya operasi yang gagal), duplicate key dihitung sebagai sukses (idempotent),
+# error lain dilempar setelah semua retry habis. Jika hasil tiap operasi tidak diketahui
+# (write concern error, koneksi putus), seluruh batch hanya diulang bila semua operasinya
+# idempotent (insert, replace, $set/$unset); batch dengan mis. $inc langsung dilempar.
+def bulk_write(collection, ops, ordered=False, max_retries=3, backoff=0.5):
+    totals = {"inserted": 0, "matched": 0, "modified": 0, "upserted": 0, "duplicates": 0, "retries": 0}
+    pending = list(ops)
+    attempt = 0
+    while pending:
+        try:
+            result = collection.bulk_write(pending, ordered=ordered)
+            _add_result(totals, result.bulk_api_result)
+            return totals
+        except BulkWriteError as e:
+            details = e.details
+            _add_result(totals, details)
+            retry_idx = []
+            fatal = []
+            for error in details.get("writeErrors", []):
+                if error.get("code") == DUPLICATE_KEY_CODE:
+                    totals["duplicates"] += 1
+                elif error.get("code") in RETRYABLE_WRITE_CODES:
+                    retry_idx.append(error["index"])
+                else:
+                    fatal.append(error)
+            if details.get("writeConcernErrors") and not retry_idx and not fatal:
+                if not all(_is_idempotent(op) for op in pending):
+                    raise
+                retry_idx = list(range(len(pending)))
+            if fatal or attempt >= max_retries:
+                raise
+            if not retry_idx:
+                return totals
+            pending = [pending[idx] for idx in retry_idx]
+        except RETRYABLE_ERRORS:
+            if attempt >= max_retries or not all(_is_idempotent(op) for op in pending):
+                raise
+        attempt += 1
+        totals["retries"] += 1
+        time.sleep(backoff * (2 ** (attempt - 1)))
+    return totals
+
+
+def _add_result(totals, raw):
+    totals["inserted"] += raw.get("nInserted", 0)
+    totals["matched"] += raw.get("nMatched", 0)
+    totals["modified"] += raw.get("nModified", 0)
+    totals["upserted"] += raw.get("nUpserted", 0)
+
+
+class BulkWriter:
+    """
+    Buffers write operations and flushes them as unordered bulk writes with retries
+    """
+
+    def __init__(self, collection, batch_size=BATCH_SIZE, ordered=False, max_retries=3, write_concern=None):
+        self.collection = with_write_concern(collection, write_concern) if write_concern else collection
+        self.batch_size = batch_size
+        self.ordered = ordered
+        self.max_retries = max_retries
+        self.ops = []
+        self.stats = {"inserted": 0, "matched": 0, "modified": 0, "upserted": 0, "duplicates": 0,
+                      "retries": 0, "batches": 0}
+
+    def add(self, op):
+        self.ops.append(op)
+        if len(self.ops) >= self.batch_size:
+            return self.flush()
+        return None
+
+    def insert(self, doc):
+        return self.add(InsertOne(doc))
+
+    def upsert(self, filter, doc):
+        # Dokumen diganti utuh; aman dijalankan ulang tanpa membuat duplikat
+        return self.add(ReplaceOne(filter, doc, upsert=True))
+
+    def update(self, filter, update, upsert=False):
+        return self.add(UpdateOne(filter, update, upsert=upsert))
+
+    def flush(self):
+        if not self.ops:
+            return None
+        ops, self.ops = self.ops, []
+        totals = bulk_write(self.collection, ops, self.ordered, self.max_retries)
+        for key, value in totals.items():
+            self.stats[key] += value
+        self.stats["batches"] += 1
+        return totals
+
+    def written(self):
+        return self.stats["inserted"] + self.stats["upserted"] + self.stats["modified"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
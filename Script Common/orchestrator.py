@@ -0,0 +1,427 @@
+# Orkestrator pipeline berbasis DAG dengan fingerprint input/output.
+#
+# Tahap-tahap (IDX, yfinance, IQNews) dideklarasikan sebagai DAG. Setiap tahap punya
+# daftar input dan output yang di-fingerprint (isi file, isi folder, atau keadaan koleksi
+# MongoDB). Sebuah tahap dilewati jika:
+#   - run terakhirnya sukses,
+#   - fingerprint input sama dengan saat run terakhir,
+#   - fingerprint output masih sama dengan hasil run terakhir (tidak dihapus/diubah), dan
+#   - umurnya belum melewati max_age (untuk tahap yang mengambil data eksternal).
+# Jika tahap hulu dijalankan ulang, outputnya berubah sehingga tahap hilir ikut dijalankan.
+# Cabang yang saling independen (IDX, yfinance, IQNews) berjalan paralel.
+#
+# Setiap skrip dijalankan sebagai proses terpisah di foldernya sendiri (skrip memakai path
+# relatif seperti "downloads/"), log disimpan di logs/<tahap>.log, dan status disimpan di
+# .orchestrator_state.json.
+#
+# Contoh:
+#   python orchestrator.py                 # jalankan semua tahap yang inputnya berubah
+#   python orchestrator.py --dry-run       # tampilkan tahap yang akan dijalankan/dilewati
+#   python orchestrator.py --only idx_transform,idx_insert_transformed --force
+#   python orchestrator.py --list
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from mongo_access import MONGO_URI, get_client
+from pipeline_metrics import get_metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BASE_DIR)
+sys.path.append(os.path.join(REPO_DIR, "Script IQNews"))
+from rangkum_filter import UNSUMMARIZED_FILTER
+
+STATE_PATH = os.environ.get("ORCHESTRATOR_STATE", os.path.join(REPO_DIR, ".orchestrator_state.json"))
+LOG_DIR = os.path.join(REPO_DIR, "logs")
+
+
+# --- Fingerprint ---
+
+class FileHasher:
+    """
+    Content hashes of files, memoized by (path, size, mtime) across runs
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or {}
+        self._lock = threading.Lock()
+
+    def hash_file(self, path):
+        stat = os.stat(path)
+        key = f"{stat.st_size}:{stat.st_mtime_ns}"
+        with self._lock:
+            cached = self.cache.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        value = digest.hexdigest()
+        with self._lock:
+            self.cache[path] = (key, value)
+        return value
+
+
+class Files:
+    """
+    Fingerprint of one file, or of every file under a folder matching a pattern
+    """
+
+    def __init__(self, path, pattern=None):
+        self.path = path
+        self.pattern = pattern
+
+    def describe(self):
+        return f"files:{os.path.relpath(self.path, REPO_DIR)}" + (f"/{self.pattern}" if self.pattern else "")
+
+    def fingerprint(self, ctx):
+        if not os.path.exists(self.path):
+            return None
+        if os.path.isfile(self.path):
+            return ctx.hasher.hash_file(self.path)
+        digest = hashlib.sha256()
+        for root, _, files in sorted(os.walk(self.path)):
+            for name in sorted(files):
+                if self.pattern and not fnmatch.fnmatch(name, self.pattern):
+                    continue
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, self.path).encode("utf-8"))
+                digest.update(ctx.hasher.hash_file(path).encode("ascii"))
+        return digest.hexdigest()
+
+
+class MongoCollection:
+    """
+    Fingerprint of a collection: document count and last _id (optionally for a filter)
+    """
+
+    def __init__(self, db, collection, query=None):
+        self.db = db
+        self.collection = collection
+        self.query = query
+
+    def describe(self):
+        return f"mongo:{self.db}.{self.collection}" + (" (filter)" if self.query else "")
+
+    def fingerprint(self, ctx):
+        collection = ctx.mongo()[self.db][self.collection]
+        query = self.query or {}
+        count = collection.count_documents(query) if query else collection.estimated_document_count()
+        last = collection.find_one(query, {"_id": 1}, sort=[("_id", -1)])
+        return f"{count}:{last['_id'] if last else None}"
+
+
+class MongoDocument:
+    """
+    Fingerprint of a single document (e.g. the pipeline's last-write marker)
+    """
+
+    def __init__(self, db, collection, doc_id):
+        self.db = db
+        self.collection = collection
+        self.doc_id = doc_id
+
+    def describe(self):
+        return f"mongo:{self.db}.{self.collection}/{self.doc_id}"
+
+    def fingerprint(self, ctx):
+        doc = ctx.mongo()[self.db][self.collection].find_one({"_id": self.doc_id})
+        return hashlib.sha256(json.dumps(doc, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class Stage:
+    """
+    One pipeline step: a script run in its own folder, with declared dependencies,
+    fingerprinted inputs/outputs and an optional freshness limit
+    """
+
+    def __init__(self, name, folder, script, args=(), deps=(), inputs=(), outputs=(), max_age_hours=None,
+                 inputs_after_run=False, manual=False):
+        self.name = name
+        self.folder = os.path.join(REPO_DIR, folder)
+        self.script = script
+        self.args = list(args)
+        self.deps = list(deps)
+        # Skrip itu sendiri selalu menjadi input, sehingga perubahan kode memicu run ulang
+        self.inputs = [Files(os.path.join(self.folder, script))] + list(inputs)
+        self.outputs = list(outputs)
+        self.max_age_hours = max_age_hours
+        # Untuk tahap yang "mengonsumsi" inputnya (mis. artikel yang belum diringkas),
+        # fingerprint input diambil setelah run agar run berikutnya tanpa data baru dilewati
+        self.inputs_after_run = inputs_after_run
+        # Tahap manual (sumber eksternal yang tidak bisa di-fingerprint) hanya dijalankan jika dipilih
+        self.manual = manual
+
+
+def build_stages():
+    idx = "Script IDX"
+    yf = "Script yfinance"
+    news = "Script IQNews"
+    idx_downloads = Files(os.path.join(REPO_DIR, idx, "downloads"), "*.json")
+    idx_transformed = Files(os.path.join(REPO_DIR, idx, "transformed_financial_data.json"))
+    idx_aggregates = Files(os.path.join(REPO_DIR, idx, "sector_aggregates.json"))
+    news_code = Files(os.path.join(REPO_DIR, news), "rangkum*.py")
+    price_marker = MongoDocument("stock_data", "pipeline_meta", "prices_last_write")
+
+    stages = [
+        # --- IDX ---
+        Stage("idx_scrape", idx, "scrape_idx.py", outputs=[idx_downloads], manual=True),
+        Stage("idx_insert_raw", idx, "insert_to_mongodb.py", deps=["idx_scrape"],
+              inputs=[idx_downloads], outputs=[MongoCollection("idx_tugas2", "laporan_tahunan")]),
+        Stage("idx_transform", idx, "spark_transform_direct.py", deps=["idx_scrape"],
+              inputs=[idx_downloads], outputs=[idx_transformed, idx_aggregates]),
+        Stage("idx_insert_transformed", idx, "insert_transformed_to_mongo.py", deps=["idx_transform"],
+              inputs=[idx_transformed, idx_aggregates],
+              outputs=[MongoCollection("idx_tugas2", "data_terstruktur"), MongoCollection("idx_tugas2", "agregat_sektor")]),
+        # --- yfinance ---
+        Stage("yf_resample", yf, "stock_to_spark.py",
+              inputs=[Files(os.path.join(REPO_DIR, yf, "tickers.xlsx"))],
+              outputs=[price_marker], max_age_hours=24),
+        Stage("yf_plot", yf, "plot_stock_data.py", deps=["yf_resample"], inputs=[price_marker]),
+        # --- IQNews (berurutan karena keduanya memakai model yang sama) ---
+        Stage("news_summarize_market", news, "rangkum_market.py",
+              inputs=[news_code, MongoCollection("news_db", "articles2", UNSUMMARIZED_FILTER)],
+              inputs_after_run=True),
+        Stage("news_summarize_stock", news, "rangkum_stock.py", deps=["news_summarize_market"],
+              inputs=[news_code, MongoCollection("news_db", "articles", UNSUMMARIZED_FILTER)],
+              inputs_after_run=True),
+    ]
+    return {stage.name: stage for stage in stages}
+
+
+# --- State dan konteks ---
+
+class Context:
+    def __init__(self, state):
+        self.state = state
+        self.hasher = FileHasher(state.setdefault("file_hashes", {}))
+        self._client = None
+        self._mongo_error = None
+        self._lock = threading.Lock()
+
+    def mongo(self):
+        with self._lock:
+            # Jika MongoDB tidak bisa dihubungi, jangan menunggu timeout lagi untuk setiap fingerprint
+            if self._mongo_error is not None:
+                raise self._mongo_error
+            if self._client is None:
+                client = get_client(MONGO_URI, serverSelectionTimeoutMS=3000)
+                try:
+                    client.admin.command("ping")
+                except Exception as e:
+                    self._mongo_error = e
+                    raise
+                self._client = client
+            return self._client
+
+    def fingerprints(self, specs):
+        result = {}
+        for spec in specs:
+            try:
+                result[spec.describe()] = spec.fingerprint(self)
+            except Exception as e:
+                # Fingerprint yang gagal dihitung dianggap berubah, sehingga tahap dijalankan
+                result[spec.describe()] = f"error:{type(e).__name__}:{time.time()}"
+        return result
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {"stages": {}, "file_hashes": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    state["file_hashes"] = {k: tuple(v) for k, v in state.get("file_hashes", {}).items()}
+    return state
+
+
+def save_state(state, path=STATE_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+# Fungsi menentukan apakah tahap perlu dijalankan; mengembalikan (perlu_run, alasan, input_fp)
+def needs_run(stage, ctx, force):
+    previous = ctx.state["stages"].get(stage.name)
+    inputs = ctx.fingerprints(stage.inputs)
+    if force:
+        return True, "dipaksa (--force)", inputs
+    if not previous or previous.get("status") != "ok":
+        return True, "belum pernah sukses", inputs
+    if previous.get("inputs") != inputs:
+        changed = [k for k in inputs if previous.get("inputs", {}).get(k) != inputs[k]]
+        return True, f"input berubah: {', '.join(changed)}", inputs
+    if stage.outputs and previous.get("outputs") != ctx.fingerprints(stage.outputs):
+        return True, "output berubah atau hilang", inputs
+    if stage.max_age_hours is not None:
+        age_hours = (time.time() - previous.get("finished_at", 0)) / 3600
+        if age_hours > stage.max_age_hours:
+            return True, f"data sudah {age_hours:.1f} jam (batas {stage.max_age_hours} jam)", inputs
+    return False, "input tidak berubah", inputs
+
+
+def run_stage(stage, metrics):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage.name}.log")
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    with metrics.timer(stage.name), open(log_path, "w", encoding="utf-8") as log:
+        result = subprocess.run([sys.executable, stage.script] + stage.args, cwd=stage.folder,
+                                stdout=log, stderr=subprocess.STDOUT, env=env)
+    return result.returncode, log_path
+
+
+# --- Scheduler ---
+
+_print_lock = threading.Lock()
+
+
+def say(message):
+    # Tahap paralel mencetak status dari beberapa thread
+    with _print_lock:
+        print(message, flush=True)
+
+
+def select_stages(stages, only):
+    if only:
+        unknown = [name for name in only if name not in stages]
+        if unknown:
+            raise SystemExit(f"❌ Tahap tidak dikenal: {', '.join(unknown)}")
+        return [name for name in stages if name in only]
+    return [name for name, stage in stages.items() if not stage.manual]
+
+
+def execute(stages, selected, ctx, workers=3, force=False, dry_run=False):
+    metrics = get_metrics("orchestrator")
+    state = ctx.state
+    pending = list(selected)
+    status = {}
+    running = {}
+    state_lock = threading.Lock()
+
+    def ready(name):
+        # Dependensi di luar pilihan (mis. tahap manual) dianggap sudah terpenuhi
+        return all(dep not in selected or status.get(dep) in ("ok", "skipped", "planned")
+                   for dep in stages[name].deps)
+
+    def blocked(name):
+        return any(status.get(dep) in ("failed", "blocked") for dep in stages[name].deps)
+
+    def work(name):
+        stage = stages[name]
+        run, reason, inputs = needs_run(stage, ctx, force)
+        if dry_run:
+            # Output tahap hulu yang akan dijalankan belum berubah, jadi tahap hilirnya ditandai juga
+            upstream = [dep for dep in stage.deps if status.get(dep) == "planned"]
+            if run or upstream:
+                say(f"▶ {name}: akan dijalankan ({reason if run else 'tahap hulu dijalankan: ' + ', '.join(upstream)})")
+                return "planned"
+        if not run:
+            metrics.count("stages_total", result="skipped")
+            say(f"⏭ {name}: dilewati ({reason})")
+            return "skipped"
+        say(f"🚀 {name}: dijalankan ({reason})")
+        started = time.time()
+        returncode, log_path = run_stage(stage, metrics)
+        elapsed = time.time() - started
+        if returncode != 0:
+            metrics.count("stages_total", result="failed")
+            say(f"❌ {name}: gagal (exit {returncode}, {elapsed:.1f} detik), lihat {log_path}")
+            with state_lock:
+                state["stages"][name] = {"status": "failed", "finished_at": time.time(), "log": log_path}
+            return "failed"
+        if stage.inputs_after_run:
+            inputs = ctx.fingerprints(stage.inputs)
+        with state_lock:
+            state["stages"][name] = {
+                "status": "ok",
+                "inputs": inputs,
+                "outputs": ctx.fingerprints(stage.outputs),
+                "finished_at": time.time(),
+                "finished_at_text": datetime.now().isoformat(timespec="seconds"),
+                "seconds": round(elapsed, 2),
+                "log": log_path,
+            }
+            save_state(state)
+        metrics.count("stages_total", result="ok")
+        say(f"✅ {name}: selesai dalam {elapsed:.1f} detik")
+        return "ok"
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in list(pending):
+                if blocked(name):
+                    status[name] = "blocked"
+                    pending.remove(name)
+                    say(f"⛔ {name}: tidak dijalankan karena tahap hulu gagal")
+                elif ready(name):
+                    running[pool.submit(work, name)] = name
+                    pending.remove(name)
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    status[name] = future.result()
+                except Exception as e:
+                    say(f"❌ {name}: error orkestrator: {e}")
+                    status[name] = "failed"
+
+    save_state(state)
+    metrics.print_summary()
+    metrics.flush()
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Menjalankan pipeline IDX, yfinance, dan IQNews sebagai DAG")
+    parser.add_argument("--only", default=None, help="Daftar tahap dipisah koma (termasuk tahap manual)")
+    parser.add_argument("--force", action="store_true", help="Jalankan walaupun input tidak berubah")
+    parser.add_argument("--dry-run", action="store_true", help="Hanya tampilkan keputusan jalan/lewati")
+    parser.add_argument("--workers", type=int, default=3, help="Jumlah tahap yang boleh berjalan bersamaan")
+    parser.add_argument("--list", action="store_true", help="Tampilkan daftar tahap dan dependensinya")
+    args = parser.parse_args()
+
+    stages = build_stages()
+    if args.list:
+        for stage in stages.values():
+            deps = ", ".join(stage.deps) or "-"
+            flag = " (manual)" if stage.manual else ""
+            print(f"- {stage.name}{flag}: {stage.script} | setelah: {deps}")
+            for spec in stage.inputs:
+                print(f"    input : {spec.describe()}")
+            for spec in stage.outputs:
+                print(f"    output: {spec.describe()}")
+        return
+
+    only = args.only.split(",") if args.only else None
+    ctx = Context(load_state())
+    start = time.perf_counter()
+    try:
+        status = execute(stages, select_stages(stages, only), ctx, args.workers, args.force, args.dry_run)
+    finally:
+        ctx.close()
+
+    counts = {value: list(status.values()).count(value) for value in set(status.values())}
+    print(f"\n✨ Selesai dalam {time.perf_counter() - start:.1f} detik: {counts}")
+    if any(value in ("failed", "blocked") for value in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
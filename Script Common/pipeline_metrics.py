@@ -0,0 +1,280 @@
+# Instrumentasi bersama untuk semua skrip pipeline (IDX, yfinance, IQNews).
+#
+# Menyediakan counter, histogram, dan timer per tahap (stage) serta event per item
+# (ticker / filing / artikel). Keluaran:
+#   - <METRICS_DIR>/<job>.prom   : format Prometheus textfile (untuk node_exporter textfile collector)
+#   - <METRICS_DIR>/<job>.jsonl  : satu baris JSON per event (trace per item)
+# Cukup murah untuk selalu aktif: counter/histogram hanya operasi dict di bawah lock,
+# event dibuffer dan ditulis per batch, dan histogram Prometheus hanya memakai label
+# dengan kardinalitas rendah (stage, timeframe, ...). Label per item (ticker, _id artikel)
+# hanya masuk ke JSON-lines.
+#
+# Konfigurasi lewat environment:
+#   METRICS_DIR          : folder keluaran (default metrics/ di root repo; kosongkan untuk menonaktifkan file)
+#   METRICS_EVENT_SAMPLE : fraksi event per item yang ditulis (default 1.0)
+#
+# Contoh:
+#   from pipeline_metrics import get_metrics
+#   metrics = get_metrics("stock_to_spark")
+#   with metrics.timer("download", ticker=ticker):
+#       ...
+#   metrics.count("documents_written", count, timeframe=timeframe)
+
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.request import urlopen
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(REPO_DIR, "metrics"))
+EVENT_SAMPLE = float(os.environ.get("METRICS_EVENT_SAMPLE", "1.0"))
+
+# Batas bucket histogram durasi (detik), dari operasi Mongo kecil sampai job Spark
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Label ini selalu dianggap per item: tidak dipakai sebagai label Prometheus
+ITEM_LABELS = {"ticker", "filing", "article", "doc_id", "file"}
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if k not in ITEM_LABELS))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = [(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+                break
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters, histograms and per-item events for one job
+    """
+
+    def __init__(self, job, instance=None, output_dir=METRICS_DIR, event_sample=EVENT_SAMPLE,
+                 flush_every=500):
+        self.job = job
+        self.instance = instance
+        self.output_dir = output_dir
+        self.event_sample = event_sample
+        self.flush_every = flush_every
+        self.started_at = time.time()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._events = []
+        self._lock = threading.Lock()
+        self._seen_spark_stages = set()
+
+    # --- Pencatatan ---
+    def count(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def event(self, name, **fields):
+        if self.event_sample < 1.0 and random.random() >= self.event_sample:
+            return
+        record = {"ts": datetime.now().isoformat(timespec="milliseconds"), "job": self.job, "event": name}
+        if self.instance is not None:
+            record["instance"] = self.instance
+        record.update(fields)
+        with self._lock:
+            self._events.append(record)
+            should_flush = len(self._events) >= self.flush_every
+        if should_flush:
+            self.flush_events()
+
+    # Timer: durasi masuk ke histogram <stage>_seconds, dan ke event jika ada label per item
+    @contextmanager
+    def timer(self, stage, **labels):
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_seconds", elapsed, stage=stage, status=status,
+                         **{k: v for k, v in labels.items() if k not in ITEM_LABELS})
+            if any(k in ITEM_LABELS for k in labels):
+                self.event(stage, seconds=round(elapsed, 6), status=status, **labels)
+
+    # --- Statistik Spark ---
+    # Statistik stage dibaca dari REST API status Spark (diisi oleh listener bus driver),
+    # sehingga tidak perlu mendaftarkan SparkListener JVM. Jika UI nonaktif, memakai
+    # statusTracker yang hanya memberi jumlah task.
+    def record_spark_stages(self, spark, stage=None):
+        try:
+            sc = spark.sparkContext
+            if sc.uiWebUrl:
+                url = f"{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}/stages?status=complete"
+                with urlopen(url, timeout=5) as resp:
+                    stages = json.load(resp)
+                for info in stages:
+                    key = (info["stageId"], info.get("attemptId", 0))
+                    if key in self._seen_spark_stages:
+                        continue
+                    self._seen_spark_stages.add(key)
+                    labels = {"stage": stage} if stage else {}
+                    self.count("spark_stages_total", **labels)
+                    self.count("spark_tasks_total", info.get("numCompleteTasks", 0), **labels)
+                    self.count("spark_executor_run_seconds_total", info.get("executorRunTime", 0) / 1000, **labels)
+                    self.count("spark_input_bytes_total", info.get("inputBytes", 0), **labels)
+                    self.count("spark_shuffle_read_bytes_total", info.get("shuffleReadBytes", 0), **labels)
+                    self.count("spark_shuffle_write_bytes_total", info.get("shuffleWriteBytes", 0), **labels)
+                    self.count("spark_spill_bytes_total", info.get("diskBytesSpilled", 0), **labels)
+            else:
+                tracker = sc.statusTracker()
+                for stage_id in tracker.getActiveStageIds():
+                    info = tracker.getStageInfo(stage_id)
+                    if info is not None:
+                        self.gauge("spark_active_stage_tasks", info.numTasks, stage_id=stage_id)
+        except Exception as e:
+            self.count("spark_stats_errors_total")
+            self.event("spark_stats_error", error=str(e))
+
+    # --- Keluaran ---
+    def _base_labels(self):
+        pairs = [("job", self.job)]
+        if self.instance is not None:
+            pairs.append(("instance", str(self.instance)))
+        return pairs
+
+    def _file_path(self, suffix):
+        name = self.job if self.instance is None else f"{self.job}_{self.instance}"
+        return os.path.join(self.output_dir, name + suffix)
+
+    def render_prometheus(self):
+        base = self._base_labels()
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {k: (h.buckets, list(h.counts), h.total, h.sum) for k, h in self._histograms.items()}
+
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"pipeline_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(base + list(labels))} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            metric = f"pipeline_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} gauge")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(base + list(labels))} {value}")
+        for (name, labels), (buckets, counts, total, total_sum) in sorted(histograms.items()):
+            metric = f"pipeline_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{metric}_bucket{_format_labels(base + list(labels) + [('le', str(bound))])} {cumulative}")
+            lines.append(f"{metric}_bucket{_format_labels(base + list(labels) + [('le', '+Inf')])} {total}")
+            lines.append(f"{metric}_sum{_format_labels(base + list(labels))} {total_sum}")
+            lines.append(f"{metric}_count{_format_labels(base + list(labels))} {total}")
+        lines.append("# TYPE pipeline_last_run_timestamp_seconds gauge")
+        lines.append(f"pipeline_last_run_timestamp_seconds{_format_labels(base)} {time.time():.0f}")
+        lines.append("# TYPE pipeline_run_duration_seconds gauge")
+        lines.append(f"pipeline_run_duration_seconds{_format_labels(base)} {time.time() - self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def flush_events(self):
+        with self._lock:
+            events, self._events = self._events, []
+        if not events or not self.output_dir:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        # Satu write per batch agar baris dari beberapa proses tidak saling menyisip
+        payload = "".join(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in events)
+        with open(self._file_path(".jsonl"), "a", encoding="utf-8") as f:
+            f.write(payload)
+
+    def write_prometheus(self):
+        if not self.output_dir:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = self._file_path(".prom")
+        # Tulis ke file sementara lalu rename agar collector tidak membaca file setengah jadi
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def flush(self):
+        try:
+            self.flush_events()
+            self.write_prometheus()
+        except OSError as e:
+            print(f"⚠ Gagal menulis metrics: {e}")
+
+    # Ringkasan waktu per tahap di akhir run, pengganti hitung manual dari baris print
+    def print_summary(self):
+        totals = {}
+        with self._lock:
+            for (name, labels), histogram in self._histograms.items():
+                if name != "stage_seconds":
+                    continue
+                stage = dict(labels).get("stage")
+                count, seconds = totals.get(stage, (0, 0.0))
+                totals[stage] = (count + histogram.total, seconds + histogram.sum)
+        if not totals:
+            return
+        print(f"\n⏱ Waktu per tahap ({self.job}):")
+        for stage, (count, seconds) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            print(f"   - {stage}: {seconds:.2f} detik ({count}x, rata-rata {seconds / count:.3f} detik)")
+
+
+# Fungsi mengambil registry untuk job ini (satu per proses); ditulis otomatis saat proses selesai
+def get_metrics(job, instance=None):
+    key = (job, instance)
+    with _registry_lock:
+        metrics = _registry.get(key)
+        if metrics is None:
+            metrics = _registry[key] = Metrics(job, instance)
+            atexit.register(metrics.flush)
+        return metrics
@@ -0,0 +1,159 @@
+# Factory SparkSession bersama dengan profil eksekusi.
+#
+# Profil (pilih lewat argumen profile atau environment SPARK_PROFILE):
+#   local-small     : laptop / data per ticker yang kecil; sedikit shuffle partition
+#   local-many-core : satu mesin dengan banyak core; partition mengikuti jumlah core
+#   cluster         : dijalankan lewat spark-submit; master dan resource dari cluster manager
+# Semua profil mengaktifkan adaptive query execution (AQE) agar partition shuffle yang kecil
+# digabung otomatis, dan Arrow untuk createDataFrame(pandas_df) / toPandas().
+#
+# Jar MongoDB Spark connector diambil dari folder lokal (SPARK_JARS_DIR, default jars/ di root
+# repo) sehingga tidak di-resolve dari internet setiap start. Siapkan sekali dengan:
+#   python spark_session.py --stage-jars
+# Jika folder belum berisi jar, connector di-resolve lewat spark.jars.packages dengan cache
+# Ivy yang persisten (.ivy2/ di root repo).
+#
+# Contoh:
+#   from spark_session import create_spark_session
+#   spark = create_spark_session("StockDataProcessor", mongo_output_uri=database_uri("stock_data"))
+
+import argparse
+import os
+from urllib.request import urlopen
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BASE_DIR)
+DEFAULT_PROFILE = os.environ.get("SPARK_PROFILE", "local-small")
+JARS_DIR = os.environ.get("SPARK_JARS_DIR", os.path.join(REPO_DIR, "jars"))
+IVY_DIR = os.path.join(REPO_DIR, ".ivy2")
+
+MONGO_CONNECTOR_PACKAGE = "org.mongodb.spark:mongo-spark-connector_2.12:3.0.2"
+# Connector 3.0.2 beserta dependensi langsungnya (driver MongoDB 4.0.5)
+MAVEN_CENTRAL = "https://repo1.maven.org/maven2"
+MONGO_CONNECTOR_JARS = [
+    "org/mongodb/spark/mongo-spark-connector_2.12/3.0.2/mongo-spark-connector_2.12-3.0.2.jar",
+    "org/mongodb/mongodb-driver-sync/4.0.5/mongodb-driver-sync-4.0.5.jar",
+    "org/mongodb/mongodb-driver-core/4.0.5/mongodb-driver-core-4.0.5.jar",
+    "org/mongodb/bson/4.0.5/bson-4.0.5.jar",
+]
+
+_CORES = os.cpu_count() or 2
+
+COMMON_CONFIG = {
+    "spark.sql.adaptive.enabled": "true",
+    "spark.sql.adaptive.coalescePartitions.enabled": "true",
+    "spark.sql.adaptive.skewJoin.enabled": "true",
+    "spark.sql.execution.arrow.pyspark.enabled": "true",
+    # Kolom yang tidak didukung Arrow tetap dikonversi dengan jalur lama
+    "spark.sql.execution.arrow.pyspark.fallback.enabled": "true",
+    "spark.serializer": "org.apache.spark.serializer.KryoSerializer",
+}
+
+PROFILES = {
+    "local-small": {
+        "master": "local[2]",
+        "config": {
+            "spark.sql.shuffle.partitions": "4",
+            "spark.default.parallelism": "4",
+            "spark.sql.adaptive.advisoryPartitionSizeInBytes": "8m",
+            "spark.sql.adaptive.coalescePartitions.initialPartitionNum": "4",
+            "spark.driver.memory": "2g",
+            "spark.sql.execution.arrow.maxRecordsPerBatch": "10000",
+        },
+    },
+    "local-many-core": {
+        "master": "local[*]",
+        "config": {
+            "spark.sql.shuffle.partitions": str(_CORES * 2),
+            "spark.default.parallelism": str(_CORES * 2),
+            "spark.sql.adaptive.advisoryPartitionSizeInBytes": "32m",
+            "spark.sql.adaptive.coalescePartitions.initialPartitionNum": str(_CORES * 4),
+            "spark.driver.memory": "8g",
+            "spark.sql.execution.arrow.maxRecordsPerBatch": "20000",
+        },
+    },
+    "cluster": {
+        # Master, executor, dan memory diatur oleh spark-submit / cluster manager
+        "master": None,
+        "config": {
+            "spark.sql.shuffle.partitions": "200",
+            "spark.sql.adaptive.advisoryPartitionSizeInBytes": "128m",
+            "spark.dynamicAllocation.enabled": "true",
+            "spark.dynamicAllocation.shuffleTracking.enabled": "true",
+        },
+    },
+}
+
+
+def staged_jars(jars_dir=JARS_DIR):
+    if not os.path.isdir(jars_dir):
+        return []
+    return sorted(os.path.join(jars_dir, f) for f in os.listdir(jars_dir) if f.endswith(".jar"))
+
+
+# Fungsi mengunduh jar connector sekali ke folder lokal
+def stage_jars(jars_dir=JARS_DIR):
+    os.makedirs(jars_dir, exist_ok=True)
+    for path in MONGO_CONNECTOR_JARS:
+        target = os.path.join(jars_dir, os.path.basename(path))
+        if os.path.exists(target):
+            print(f"✅ {os.path.basename(path)} sudah ada")
+            continue
+        print(f"📥 Mengunduh {os.path.basename(path)}...")
+        with urlopen(f"{MAVEN_CENTRAL}/{path}", timeout=60) as resp, open(target + ".part", "wb") as f:
+            f.write(resp.read())
+        os.replace(target + ".part", target)
+    print(f"✨ Jar tersimpan di {jars_dir}")
+
+
+def build_config(profile=DEFAULT_PROFILE, mongo=False, mongo_output_uri=None, extra_config=None):
+    if profile not in PROFILES:
+        raise ValueError(f"Profil Spark tidak dikenal: {profile} (pilihan: {', '.join(PROFILES)})")
+    config = dict(COMMON_CONFIG)
+    config.update(PROFILES[profile]["config"])
+    if mongo or mongo_output_uri:
+        jars = staged_jars()
+        if jars:
+            config["spark.jars"] = ",".join(jars)
+        else:
+            config["spark.jars.packages"] = MONGO_CONNECTOR_PACKAGE
+            config["spark.jars.ivy"] = IVY_DIR
+        if mongo_output_uri:
+            config["spark.mongodb.output.uri"] = mongo_output_uri
+    config.update(extra_config or {})
+    return config
+
+
+def create_spark_session(app_name, profile=None, mongo=False, mongo_output_uri=None, extra_config=None):
+    """
+    Build (or reuse) a SparkSession configured for the given execution profile
+    """
+    from pyspark.sql import SparkSession
+
+    profile = profile or DEFAULT_PROFILE
+    builder = SparkSession.builder.appName(app_name)
+    master = PROFILES.get(profile, {}).get("master")
+    if master:
+        builder = builder.master(master)
+    for key, value in build_config(profile, mongo, mongo_output_uri, extra_config).items():
+        builder = builder.config(key, value)
+    spark = builder.getOrCreate()
+    print(f"⚙ Spark profile '{profile}' ({spark.sparkContext.master}, "
+          f"{spark.conf.get('spark.sql.shuffle.partitions')} shuffle partitions)")
+    return spark
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profil SparkSession bersama")
+    parser.add_argument("--stage-jars", action="store_true", help="Unduh jar MongoDB Spark connector ke SPARK_JARS_DIR")
+    parser.add_argument("--show", default=None, choices=list(PROFILES), help="Tampilkan konfigurasi sebuah profil")
+    args = parser.parse_args()
+    if args.stage_jars:
+        stage_jars()
+    if args.show:
+        for key, value in sorted(build_config(args.show, mongo=True).items()):
+            print(f"{key}={value}")
+
+
+if __name__ == "__main__":
+    main()
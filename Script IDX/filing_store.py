@@ -0,0 +1,234 @@
+# pip install pymongo zstandard
+#
+# Penyimpanan ringkas (compact) untuk filing mentah IDX.
+#
+# Setiap filing disimpan sebagai satu dokumen di laporan_tahunan_compact:
+#   - tag yang dipakai transform (MAPPED_TAGS) dan tag metadata (METADATA_TAGS) dipromosikan
+#     menjadi field top-level bertipe (angka -> double, tanggal -> datetime)
+#   - semua tag lain di-encode sebagai BSON lalu dikompres (zstd jika library zstandard
+#     terpasang, selain itu zlib) ke satu field biner extra_blob
+# Inverted index tag -> filing disimpan di laporan_tag_index ({_id: tag, filings: [...]})
+# sehingga query ad-hoc untuk tag yang tidak dipromosikan hanya membuka blob filing yang
+# memang memiliki tag tersebut.
+#
+# Contoh:
+#   python filing_store.py --tag OtherFinancialTag12
+#   python filing_store.py --tag Assets --limit 5
+#   python filing_store.py --stats
+
+import argparse
+import os
+import re
+import sys
+import zlib
+from datetime import datetime
+
+import bson
+from bson.binary import Binary
+from pymongo import UpdateOne
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from mongo_access import bulk_write, find_batched, get_db
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Tag angka laporan keuangan yang dibaca oleh map_filing di spark_transform_direct.py
+MAPPED_TAGS = [
+    "SalesAndRevenue", "SalesAndRevenueMoreThan10Percent",
+    "GrossProfit", "ProfitLoss", "ProfitLossAttributableToParentEntity", "ProfitLossBeforeIncomeTax",
+    "CashAndCashEquivalents", "Assets", "Equity", "EquityAttributableToEquityOwnersOfParentEntity",
+    "ShortTermLoans", "LongTermBankLoans",
+    "NetCashFlowsReceivedFromUsedInOperatingActivities",
+    "NetCashFlowsReceivedFromUsedInInvestingActivities",
+    "NetCashFlowsReceivedFromUsedInFinancingActivities",
+]
+# Tag identitas dan periode laporan (Sector, Subsector, CurrentPeriodEndDate juga dibaca map_filing),
+# ikut dipromosikan agar bisa difilter tanpa membuka blob
+METADATA_TAGS = ["EntityName", "EntityCode", "Sector", "Subsector", "CurrentPeriodEndDate"]
+PROMOTED_TAGS = MAPPED_TAGS + METADATA_TAGS
+
+DB_NAME = "idx_tugas2"
+COMPACT_COLLECTION = "laporan_tahunan_compact"
+TAG_INDEX_COLLECTION = "laporan_tag_index"
+
+NUMBER_PATTERN = re.compile(r"^-?[0-9]+(\.[0-9]+)?$")
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+# Fungsi konversi nilai tag (string dari XBRL) ke tipe yang sesuai
+def to_typed(value):
+    if not isinstance(value, str):
+        return value
+    text = value.strip()
+    if NUMBER_PATTERN.match(text):
+        return float(text)
+    if DATE_PATTERN.match(text):
+        try:
+            return datetime.strptime(text, "%Y-%m-%d")
+        except ValueError:
+            return value
+    return value
+
+
+# Fungsi kebalikan to_typed untuk pembaca yang mengharapkan teks (mis. schema Spark StringType)
+def to_text(value):
+    if value is None:
+        return None
+    if isinstance(value, float):
+        # Tanpa notasi eksponen agar tetap cocok dengan pola angka di to_float_safe
+        text = repr(value)
+        return text if "e" not in text else format(value, "f")
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+def compress(payload):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(payload)
+    return "zlib", zlib.compress(payload, 6)
+
+
+def decompress(codec, blob):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Blob dikompres dengan zstd, tetapi library zstandard tidak terpasang")
+        return zstandard.ZstdDecompressor().decompress(bytes(blob))
+    if codec == "zlib":
+        return zlib.decompress(bytes(blob))
+    raise ValueError(f"Codec tidak dikenal: {codec}")
+
+
+def compact_filing(data, source_file):
+    """
+    Build the compact document for one raw filing: promoted tags as typed fields, the rest as a compressed blob
+    """
+    lk = data.get("laporan_keuangan") or {}
+    doc = {"source_file": source_file, "emiten": data.get("emiten", "Unknown")}
+    extra = {}
+    for tag, value in lk.items():
+        if tag in PROMOTED_TAGS:
+            doc[tag] = to_typed(value)
+        else:
+            extra[tag] = value
+    # Field lain di luar laporan_keuangan ikut disimpan apa adanya
+    for key, value in data.items():
+        if key not in ("laporan_keuangan", "emiten"):
+            doc.setdefault(key, value)
+    codec, blob = compress(bson.encode(extra))
+    doc.update({
+        "extra_codec": codec,
+        "extra_blob": Binary(blob),
+        "extra_count": len(extra),
+    })
+    return doc
+
+
+def filing_tags(data):
+    return [tag for tag, value in (data.get("laporan_keuangan") or {}).items() if value is not None]
+
+
+def extra_tags(doc):
+    if not doc.get("extra_blob"):
+        return {}
+    return bson.decode(decompress(doc["extra_codec"], doc["extra_blob"]))
+
+
+def expand_filing(doc):
+    """
+    Rebuild the {"emiten", "laporan_keuangan"} shape of the original filing (promoted tags stay typed)
+    """
+    lk = {tag: doc[tag] for tag in PROMOTED_TAGS if tag in doc}
+    lk.update(extra_tags(doc))
+    return {"emiten": doc.get("emiten"), "laporan_keuangan": lk}
+
+
+# Fungsi memperbarui inverted index tag -> filing untuk satu batch filing
+def update_tag_index(index_collection, tags_by_filing):
+    filings_by_tag = {}
+    for source_file, tags in tags_by_filing.items():
+        for tag in tags:
+            filings_by_tag.setdefault(tag, []).append(source_file)
+    ops = [UpdateOne({"_id": tag}, {"$addToSet": {"filings": {"$each": files}}}, upsert=True)
+           for tag, files in filings_by_tag.items()]
+    if ops:
+        bulk_write(index_collection, ops)
+    return len(ops)
+
+
+def find_mapped(collection, query=None, batch_size=1000):
+    """
+    Iterate compact filings with only the promoted fields (the blob is never read)
+    """
+    projection = {tag: 1 for tag in PROMOTED_TAGS}
+    projection.update({"_id": 0, "source_file": 1, "emiten": 1})
+    return find_batched(collection, query, projection, batch_size=batch_size)
+
+
+def query_tag(db, tag, filings=None, limit=0):
+    """
+    Yield (source_file, emiten, value) for every filing that has the tag
+    """
+    collection = db[COMPACT_COLLECTION]
+    if tag in PROMOTED_TAGS:
+        query = {tag: {"$ne": None}}
+        if filings is not None:
+            query["source_file"] = {"$in": list(filings)}
+        projection = {"_id": 0, "source_file": 1, "emiten": 1, tag: 1}
+        for doc in find_batched(collection, query, projection, limit=limit):
+            yield doc["source_file"], doc.get("emiten"), doc.get(tag)
+        return
+
+    entry = db[TAG_INDEX_COLLECTION].find_one({"_id": tag}) or {"filings": []}
+    candidates = entry["filings"]
+    if filings is not None:
+        wanted = set(filings)
+        candidates = [f for f in candidates if f in wanted]
+    found = 0
+    projection = {"_id": 0, "source_file": 1, "emiten": 1, "extra_codec": 1, "extra_blob": 1}
+    for doc in find_batched(collection, {"source_file": {"$in": candidates}}, projection, batch_size=100):
+        # Index bisa berisi filing lama yang sudah tidak memiliki tag ini; cek ulang dari blob
+        extra = extra_tags(doc)
+        if tag not in extra:
+            continue
+        yield doc["source_file"], doc.get("emiten"), extra[tag]
+        found += 1
+        if limit and found >= limit:
+            return
+
+
+def storage_stats(db, collections=("laporan_tahunan", COMPACT_COLLECTION, TAG_INDEX_COLLECTION)):
+    stats = {}
+    for name in collections:
+        try:
+            info = db.command("collstats", name)
+            stats[name] = {"count": info.get("count", 0), "size": info.get("size", 0),
+                           "storage_size": info.get("storageSize", 0)}
+        except Exception as e:
+            stats[name] = {"error": str(e)}
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query tag ad-hoc pada penyimpanan compact filing IDX")
+    parser.add_argument("--tag", default=None, help="Nama tag XBRL yang dicari")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--stats", action="store_true", help="Bandingkan ukuran koleksi full dan compact")
+    args = parser.parse_args()
+
+    db = get_db(DB_NAME)
+    if args.stats:
+        for name, info in storage_stats(db).items():
+            print(f"{name}: {info}")
+    if args.tag:
+        rows = list(query_tag(db, args.tag, limit=args.limit))
+        print(f"{len(rows)} filing dengan tag {args.tag}:")
+        for source_file, emiten, value in rows:
+            print(f"   - {emiten} ({source_file}): {value}")
+
+
+if __name__ == "__main__":
+    main()
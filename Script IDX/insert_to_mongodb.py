@@ -1,33 +1,91 @@
 # pip install pymongo
 
+import argparse
 import json
 import os
-from pymongo import MongoClient
-
-# Koneksi ke MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client["idx_tugas2"]
-collection = db["laporan_tahunan"]
-
-# Folder JSON
-json_folder = os.path.abspath("downloads")
-json_files = [f for f in os.listdir(json_folder) if f.endswith(".json")]
-
-if not json_files:
-    print("Tidak ada file JSON untuk diproses.")
-    exit()
-
-# Masukkan JSON ke MongoDB
-for json_file in json_files:
-    json_path = os.path.join(json_folder, json_file)
-
-    try:
-        with open(json_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
-            collection.insert_one(data)
-            print(f"Data dari {json_file} berhasil dimasukkan ke MongoDB.")
-    except Exception as e:
-        print(f"ERROR saat memasukkan {json_file}: {e}")
-
-print(f"Total dokumen di MongoDB: {collection.count_documents({})}")
-print("Proses selesai.")
\ No newline at end of file
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from filing_store import COMPACT_COLLECTION, TAG_INDEX_COLLECTION, compact_filing, filing_tags, update_tag_index
+from mongo_access import BulkWriter, get_db
+from pipeline_metrics import get_metrics
+
+# Mode penyimpanan default: "full" (dokumen utuh) atau "compact" (lihat filing_store.py)
+STORAGE_MODE = os.environ.get("IDX_STORAGE_MODE", "full")
+
+# Masukkan semua file JSON di folder ke koleksi MongoDB.
+# Setiap filing di-upsert berdasarkan nama file (field source_file) dalam bulk write
+# unordered, sehingga menjalankan ulang skrip tidak membuat dokumen duplikat.
+# Jika tag_index diisi, filing disimpan dalam bentuk compact dan inverted index tag -> filing
+# diperbarui setelah semua filing ditulis.
+def insert_filings(collection, json_folder, metrics=None, tag_index=None):
+    json_files = [f for f in os.listdir(json_folder) if f.endswith(".json")]
+
+    if not json_files:
+        print("Tidak ada file JSON untuk diproses.")
+        return 0
+
+    collection.create_index("source_file")
+    queued = 0
+    tags_by_filing = {}
+    with BulkWriter(collection) as writer:
+        for json_file in json_files:
+            json_path = os.path.join(json_folder, json_file)
+
+            start = time.perf_counter()
+            try:
+                with open(json_path, "r", encoding="utf-8") as file:
+                    data = json.load(file)
+                    if tag_index is not None:
+                        tags_by_filing[json_file] = filing_tags(data)
+                        data = compact_filing(data, json_file)
+                    else:
+                        data["source_file"] = json_file
+                    writer.upsert({"source_file": json_file}, data)
+                    queued += 1
+                    status = "ok"
+            except Exception as e:
+                print(f"ERROR saat memasukkan {json_file}: {e}")
+                status = "error"
+            if metrics is not None:
+                elapsed = time.perf_counter() - start
+                metrics.count("filings_total", status=status)
+                metrics.observe("filing_load_seconds", elapsed)
+                metrics.event("filing_load", filing=json_file, status=status, seconds=round(elapsed, 6))
+
+    if tag_index is not None:
+        tag_count = update_tag_index(tag_index, tags_by_filing)
+        print(f"{tag_count} tag diperbarui di inverted index {tag_index.name}.")
+
+    print(f"{queued} filing disimpan ke MongoDB ({writer.stats['upserted']} baru, "
+          f"{writer.stats['modified']} diperbarui, {writer.stats['batches']} batch).")
+    return queued
+
+def main():
+    parser = argparse.ArgumentParser(description="Masukkan filing IDX mentah ke MongoDB")
+    parser.add_argument("--mode", default=STORAGE_MODE, choices=["full", "compact"])
+    args = parser.parse_args()
+
+    # Koneksi ke MongoDB
+    db = get_db("idx_tugas2")
+    if args.mode == "compact":
+        collection = db[COMPACT_COLLECTION]
+        tag_index = db[TAG_INDEX_COLLECTION]
+    else:
+        collection = db["laporan_tahunan"]
+        tag_index = None
+
+    # Folder JSON
+    json_folder = os.path.abspath("downloads")
+    metrics = get_metrics("insert_to_mongodb")
+    with metrics.timer("insert_filings", mode=args.mode):
+        insert_filings(collection, json_folder, metrics, tag_index)
+
+    print(f"Total dokumen di MongoDB: {collection.count_documents({})}")
+    print("Proses selesai.")
+    metrics.print_summary()
+    metrics.flush()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
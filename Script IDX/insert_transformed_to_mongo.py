@@ -2,31 +2,66 @@
 
 import json
 import os
-from pymongo import MongoClient
-
-# Koneksi ke MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client["idx_tugas2"]
-collection = db["data_terstruktur"]
-
-# Path file hasil transformasi
-json_path = os.path.abspath("transformed_financial_data.json")
-
-if not os.path.exists(json_path):
-    print("File hasil transformasi tidak ditemukan.")
-    exit()
-
-# Masukkan JSON ke MongoDB
-try:
-    with open(json_path, "r", encoding="utf-8") as file:
-        data = json.load(file)
-        if isinstance(data, list):
-            collection.insert_many(data)
-            print(f"{len(data)} dokumen berhasil dimasukkan ke MongoDB.")
-        else:
-            print("Format data bukan list, gagal dimasukkan.")
-except Exception as e:
-    print(f"ERROR saat memasukkan data: {e}")
-
-print(f"Total dokumen di MongoDB: {collection.count_documents({})}")
-print("Proses selesai.")
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from mongo_access import BulkWriter, get_db
+from pipeline_metrics import get_metrics
+
+# Masukkan file hasil transformasi (list dokumen) ke koleksi MongoDB.
+# Dokumen di-upsert berdasarkan field kunci (default source_file) dalam bulk write
+# unordered, sehingga hasil transformasi terbaru menggantikan versi lama tanpa duplikat.
+def insert_transformed(collection, json_path, keys=("source_file",), unique=False):
+    if not os.path.exists(json_path):
+        print("File hasil transformasi tidak ditemukan.")
+        return 0
+
+    try:
+        with open(json_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+            if isinstance(data, list):
+                collection.create_index([(key, 1) for key in keys], unique=unique)
+                with BulkWriter(collection) as writer:
+                    for doc in data:
+                        if all(doc.get(key) for key in keys):
+                            writer.upsert({key: doc[key] for key in keys}, doc)
+                        else:
+                            writer.insert(doc)
+                print(f"{len(data)} dokumen berhasil dimasukkan ke MongoDB.")
+                return len(data)
+            else:
+                print("Format data bukan list, gagal dimasukkan.")
+    except Exception as e:
+        print(f"ERROR saat memasukkan data: {e}")
+    return 0
+
+# Index untuk lookup satu emiten per periode dan daftar peer dalam satu sektor
+def create_peer_indexes(collection):
+    collection.create_index([("periode", 1), ("nama", 1)])
+    collection.create_index([("periode", 1), ("sektor", 1)])
+
+def main():
+    # Koneksi ke MongoDB
+    db = get_db("idx_tugas2")
+    collection = db["data_terstruktur"]
+    aggregates_collection = db["agregat_sektor"]
+
+    # Path file hasil transformasi
+    json_path = os.path.abspath("transformed_financial_data.json")
+    aggregates_path = os.path.abspath("sector_aggregates.json")
+    metrics = get_metrics("insert_transformed_to_mongo")
+    with metrics.timer("insert_transformed"):
+        inserted = insert_transformed(collection, json_path)
+    metrics.count("documents_written_total", inserted, collection="data_terstruktur")
+    with metrics.timer("insert_sector_aggregates"):
+        aggregates = insert_transformed(aggregates_collection, aggregates_path, keys=("periode", "sektor"), unique=True)
+    metrics.count("documents_written_total", aggregates, collection="agregat_sektor")
+    create_peer_indexes(collection)
+
+    print(f"Total dokumen di MongoDB: {collection.count_documents({})}")
+    print("Proses selesai.")
+    metrics.print_summary()
+    metrics.flush()
+
+if __name__ == "__main__":
+    main()
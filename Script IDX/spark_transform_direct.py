@@ -1,71 +1,20 @@
 # spark_transform_json.py
 # pip install pyspark
 
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, when
+from pyspark.sql import Window
+from pyspark.sql.functions import add_months, coalesce, col, count, date_format, expr, lit, percent_rank, to_date, when
+from pyspark.sql.functions import max as spark_max, sum as spark_sum
 from pyspark.sql.types import StructType, StructField, StringType, FloatType
+import argparse
 import os
 import json
+import sys
 
-# Inisialisasi Spark Session
-spark = SparkSession.builder \
-    .appName("Transformasi Data Keuangan IDX") \
-    .getOrCreate()
-
-print("Memulai transformasi data JSON dengan Apache Spark...")
-
-# Folder yang berisi file JSON
-json_folder = os.path.abspath("downloads")
-json_files = [f for f in os.listdir(json_folder) if f.endswith(".json")]
-
-if not json_files:
-    print("Tidak ada file JSON untuk diproses.")
-    exit()
-
-all_data = []
-
-# Baca dan gabungkan semua file JSON
-for json_file in json_files:
-    path = os.path.join(json_folder, json_file)
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if "laporan_keuangan" in data:
-                lk = data["laporan_keuangan"]
-
-                # Mapping ke nama atribut pendek dan bahasa Indonesia
-                mapped = {
-                    "nama": data.get("emiten", "Unknown"),
-
-                    # Laba Rugi
-                    "pendapatan": lk.get("SalesAndRevenue") or lk.get("SalesAndRevenueMoreThan10Percent"),
-                    "laba_kotor": lk.get("GrossProfit"),
-                    "laba_bersih": lk.get("ProfitLoss") or lk.get("ProfitLossAttributableToParentEntity"),
-                    "laba_sebelum_pajak": lk.get("ProfitLossBeforeIncomeTax"),
-
-                    # Neraca
-                    "kas": lk.get("CashAndCashEquivalents"),
-                    "aset": lk.get("Assets"),
-                    "ekuitas": lk.get("Equity") or lk.get("EquityAttributableToEquityOwnersOfParentEntity"),
-                    "pinjaman_pendek": lk.get("ShortTermLoans"),
-                    "pinjaman_panjang": lk.get("LongTermBankLoans"),
-
-                    # Arus Kas
-                    "arus_operasi": lk.get("NetCashFlowsReceivedFromUsedInOperatingActivities"),
-                    "arus_investasi": lk.get("NetCashFlowsReceivedFromUsedInInvestingActivities"),
-                    "arus_pendanaan": lk.get("NetCashFlowsReceivedFromUsedInFinancingActivities"),
-
-                    # Metadata
-                    "source_file": json_file
-                }
-
-                all_data.append(mapped)
-    except Exception as e:
-        print(f"ERROR membaca {json_file}: {e}")
-
-if not all_data:
-    print("Data kosong setelah parsing JSON.")
-    exit()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from filing_store import COMPACT_COLLECTION, PROMOTED_TAGS, find_mapped, to_text
+from mongo_access import get_db
+from pipeline_metrics import get_metrics
+from spark_session import create_spark_session
 
 # Tentukan schema
 schema = StructType([
@@ -82,42 +31,220 @@ schema = StructType([
     StructField("arus_operasi", StringType(), True),
     StructField("arus_investasi", StringType(), True),
     StructField("arus_pendanaan", StringType(), True),
+    StructField("sektor", StringType(), True),
+    StructField("periode", StringType(), True),
     StructField("source_file", StringType(), True),
 ])
 
-# Buat DataFrame dari data JSON
-df = spark.createDataFrame(all_data, schema=schema)
+# Metrik yang diberi peringkat persentil per periode, di seluruh pasar dan di dalam sektor
+RANKED_METRICS = ["margin_laba", "rasio_ekuitas_aset", "leverage", "pertumbuhan_pendapatan"]
+# Nilai sektor untuk baris agregat seluruh pasar
+ALL_SECTORS = "SEMUA"
+
+# Mapping ke nama atribut pendek dan bahasa Indonesia
+def map_filing(data, json_file):
+    lk = data["laporan_keuangan"]
+    return {
+        "nama": data.get("emiten", "Unknown"),
+
+        # Laba Rugi
+        "pendapatan": lk.get("SalesAndRevenue") or lk.get("SalesAndRevenueMoreThan10Percent"),
+        "laba_kotor": lk.get("GrossProfit"),
+        "laba_bersih": lk.get("ProfitLoss") or lk.get("ProfitLossAttributableToParentEntity"),
+        "laba_sebelum_pajak": lk.get("ProfitLossBeforeIncomeTax"),
+
+        # Neraca
+        "kas": lk.get("CashAndCashEquivalents"),
+        "aset": lk.get("Assets"),
+        "ekuitas": lk.get("Equity") or lk.get("EquityAttributableToEquityOwnersOfParentEntity"),
+        "pinjaman_pendek": lk.get("ShortTermLoans"),
+        "pinjaman_panjang": lk.get("LongTermBankLoans"),
+
+        # Arus Kas
+        "arus_operasi": lk.get("NetCashFlowsReceivedFromUsedInOperatingActivities"),
+        "arus_investasi": lk.get("NetCashFlowsReceivedFromUsedInInvestingActivities"),
+        "arus_pendanaan": lk.get("NetCashFlowsReceivedFromUsedInFinancingActivities"),
+
+        # Metadata
+        "sektor": lk.get("Sector") or lk.get("Subsector") or "Unknown",
+        "periode": lk.get("CurrentPeriodEndDate") or "Unknown",
+        "source_file": json_file
+    }
+
+# Baca dan gabungkan semua file JSON
+def load_filings(json_folder, json_files, metrics=None):
+    all_data = []
+    for json_file in json_files:
+        path = os.path.join(json_folder, json_file)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+                if "laporan_keuangan" in data:
+                    all_data.append(map_filing(data, json_file))
+                    status = "ok"
+                else:
+                    status = "no_laporan_keuangan"
+        except Exception as e:
+            print(f"ERROR membaca {json_file}: {e}")
+            status = "error"
+        if metrics is not None:
+            metrics.count("filings_total", status=status)
+    return all_data
+
+# Baca filing dari penyimpanan compact: hanya field yang dipromosikan, blob tag lain tidak diambil
+def load_filings_from_store(collection, metrics=None):
+    all_data = []
+    for doc in find_mapped(collection):
+        lk = {tag: to_text(doc.get(tag)) for tag in PROMOTED_TAGS}
+        all_data.append(map_filing({"emiten": doc.get("emiten", "Unknown"), "laporan_keuangan": lk},
+                                   doc["source_file"]))
+        if metrics is not None:
+            metrics.count("filings_total", status="ok")
+    return all_data
 
 # Fungsi konversi string ke float yang aman
 def to_float_safe(column):
     return when(col(column).rlike(r"^[0-9.\-]+$"), col(column).cast("float")).otherwise(None)
 
+# Pertumbuhan pendapatan year-on-year: setiap filing dicocokkan dengan filing emiten yang sama
+# untuk akhir periode tepat satu tahun sebelumnya. Periode yang tidak diketahui, atau tanpa
+# filing pembanding, menghasilkan null.
+def add_revenue_growth(df):
+    known = col("periode").rlike(r"^\d{4}-\d{2}-\d{2}$")
+    previous = df.where(known) \
+        .groupBy(col("nama").alias("nama_sebelumnya"), col("periode").alias("periode_sebelumnya")) \
+        .agg(spark_max("pendapatan").alias("pendapatan_sebelumnya"))
+    df = df.withColumn("periode_pembanding",
+                       when(known, date_format(add_months(to_date("periode"), -12), "yyyy-MM-dd")))
+    return df \
+        .join(previous, (col("nama") == col("nama_sebelumnya")) &
+              (col("periode_pembanding") == col("periode_sebelumnya")), "left") \
+        .withColumn("pertumbuhan_pendapatan", when(col("pendapatan_sebelumnya") > 0,
+                                                   col("pendapatan") / col("pendapatan_sebelumnya") - 1)) \
+        .drop("nama_sebelumnya", "periode_sebelumnya", "periode_pembanding", "pendapatan_sebelumnya")
+
 # Transformasi numerik dan hitung rasio
-transformed_df = df \
-    .withColumn("pendapatan", to_float_safe("pendapatan")) \
-    .withColumn("laba_kotor", to_float_safe("laba_kotor")) \
-    .withColumn("laba_bersih", to_float_safe("laba_bersih")) \
-    .withColumn("laba_sebelum_pajak", to_float_safe("laba_sebelum_pajak")) \
-    .withColumn("kas", to_float_safe("kas")) \
-    .withColumn("aset", to_float_safe("aset")) \
-    .withColumn("ekuitas", to_float_safe("ekuitas")) \
-    .withColumn("pinjaman_pendek", to_float_safe("pinjaman_pendek")) \
-    .withColumn("pinjaman_panjang", to_float_safe("pinjaman_panjang")) \
-    .withColumn("arus_operasi", to_float_safe("arus_operasi")) \
-    .withColumn("arus_investasi", to_float_safe("arus_investasi")) \
-    .withColumn("arus_pendanaan", to_float_safe("arus_pendanaan")) \
-    .withColumn("margin_laba", when(col("pendapatan") > 0, col("laba_bersih") / col("pendapatan"))) \
-    .withColumn("rasio_ekuitas_aset", when(col("aset") > 0, col("ekuitas") / col("aset")))
-
-# Tampilkan ringkasan hasil transformasi
-print("\nHasil transformasi ringkas:")
-transformed_df.select(
-    "nama", "pendapatan", "laba_bersih", "margin_laba", "aset", "ekuitas", "rasio_ekuitas_aset"
-).orderBy(col("margin_laba").desc()).show(truncate=False)
-
-# Simpan ke file JSON
-output_path = os.path.abspath("transformed_financial_data.json")
-transformed_df.toPandas().to_json(output_path, orient="records", indent=4, force_ascii=False)
-
-print(f"\nTransformasi selesai dan disimpan ke: {output_path}")
-spark.stop()
+def transform_filings(spark, all_data):
+    # Buat DataFrame dari data JSON
+    df = spark.createDataFrame(all_data, schema=schema)
+
+    df = df \
+        .withColumn("pendapatan", to_float_safe("pendapatan")) \
+        .withColumn("laba_kotor", to_float_safe("laba_kotor")) \
+        .withColumn("laba_bersih", to_float_safe("laba_bersih")) \
+        .withColumn("laba_sebelum_pajak", to_float_safe("laba_sebelum_pajak")) \
+        .withColumn("kas", to_float_safe("kas")) \
+        .withColumn("aset", to_float_safe("aset")) \
+        .withColumn("ekuitas", to_float_safe("ekuitas")) \
+        .withColumn("pinjaman_pendek", to_float_safe("pinjaman_pendek")) \
+        .withColumn("pinjaman_panjang", to_float_safe("pinjaman_panjang")) \
+        .withColumn("arus_operasi", to_float_safe("arus_operasi")) \
+        .withColumn("arus_investasi", to_float_safe("arus_investasi")) \
+        .withColumn("arus_pendanaan", to_float_safe("arus_pendanaan")) \
+        .withColumn("margin_laba", when(col("pendapatan") > 0, col("laba_bersih") / col("pendapatan"))) \
+        .withColumn("rasio_ekuitas_aset", when(col("aset") > 0, col("ekuitas") / col("aset"))) \
+        .withColumn("leverage", when(col("ekuitas") > 0,
+                                     (coalesce(col("pinjaman_pendek"), lit(0.0)) +
+                                      coalesce(col("pinjaman_panjang"), lit(0.0))) / col("ekuitas")))
+    return add_revenue_growth(df)
+
+# Peringkat persentil (0 = terendah, 1 = tertinggi) per periode dengan window function.
+# Baris dengan nilai kosong dipisah ke partisi sendiri agar tidak ikut diperingkat.
+def add_peer_ranks(df):
+    for metric in RANKED_METRICS:
+        has_value = col(metric).isNotNull()
+        market = Window.partitionBy("periode", has_value).orderBy(metric)
+        sector = Window.partitionBy("periode", "sektor", has_value).orderBy(metric)
+        df = df \
+            .withColumn(f"{metric}_pct_pasar", when(has_value, percent_rank().over(market))) \
+            .withColumn(f"{metric}_pct_sektor", when(has_value, percent_rank().over(sector)))
+    return df
+
+# Agregat per (periode, sektor): jumlah emiten, total, kuartil dan median setiap metrik.
+# Baris dengan sektor SEMUA berisi agregat seluruh pasar pada periode tersebut.
+def sector_aggregates(df):
+    aggregations = [
+        count(lit(1)).alias("jumlah_emiten"),
+        spark_sum("pendapatan").alias("total_pendapatan"),
+        spark_sum("laba_bersih").alias("total_laba_bersih"),
+        spark_sum("aset").alias("total_aset"),
+        spark_sum("ekuitas").alias("total_ekuitas"),
+    ]
+    for metric in RANKED_METRICS:
+        aggregations.append(expr(f"percentile({metric}, array(0.25, 0.5, 0.75))").alias(f"{metric}_kuartil"))
+
+    per_sector = df.groupBy("periode", "sektor").agg(*aggregations)
+    market = df.groupBy("periode").agg(*aggregations).withColumn("sektor", lit(ALL_SECTORS))
+    combined = per_sector.unionByName(market)
+
+    columns = [col("periode"), col("sektor"), col("jumlah_emiten"), col("total_pendapatan"),
+               col("total_laba_bersih"), col("total_aset"), col("total_ekuitas")]
+    for metric in RANKED_METRICS:
+        quartiles = col(f"{metric}_kuartil")
+        columns += [quartiles.getItem(0).alias(f"{metric}_q1"),
+                    quartiles.getItem(1).alias(f"{metric}_median"),
+                    quartiles.getItem(2).alias(f"{metric}_q3")]
+    return combined.select(*columns)
+
+def main():
+    parser = argparse.ArgumentParser(description="Transformasi laporan keuangan IDX dengan Spark")
+    parser.add_argument("--source", default="files", choices=["files", "compact"],
+                        help="files: JSON di downloads/, compact: koleksi laporan_tahunan_compact")
+    args = parser.parse_args()
+
+    metrics = get_metrics("spark_transform_direct")
+
+    # Inisialisasi Spark Session
+    with metrics.timer("spark_startup"):
+        spark = create_spark_session("Transformasi Data Keuangan IDX")
+
+    print("Memulai transformasi data JSON dengan Apache Spark...")
+
+    if args.source == "compact":
+        with metrics.timer("load_filings", source="compact"):
+            all_data = load_filings_from_store(get_db("idx_tugas2")[COMPACT_COLLECTION], metrics)
+    else:
+        # Folder yang berisi file JSON
+        json_folder = os.path.abspath("downloads")
+        json_files = [f for f in os.listdir(json_folder) if f.endswith(".json")]
+
+        if not json_files:
+            print("Tidak ada file JSON untuk diproses.")
+            exit()
+
+        with metrics.timer("load_filings", source="files"):
+            all_data = load_filings(json_folder, json_files, metrics)
+
+    if not all_data:
+        print("Data kosong setelah parsing JSON.")
+        exit()
+
+    with metrics.timer("transform"):
+        transformed_df = add_peer_ranks(transform_filings(spark, all_data)).cache()
+        metrics.count("rows_transformed_total", transformed_df.count())
+
+    # Tampilkan ringkasan hasil transformasi
+    print("\nHasil transformasi ringkas:")
+    transformed_df.select(
+        "nama", "pendapatan", "laba_bersih", "margin_laba", "aset", "ekuitas", "rasio_ekuitas_aset"
+    ).orderBy(col("margin_laba").desc()).show(truncate=False)
+
+    # Simpan ke file JSON
+    output_path = os.path.abspath("transformed_financial_data.json")
+    with metrics.timer("write_json"):
+        transformed_df.toPandas().to_json(output_path, orient="records", indent=4, force_ascii=False)
+
+    print(f"\nTransformasi selesai dan disimpan ke: {output_path}")
+
+    # Agregat sektor per periode, dimuat ke koleksi agregat_sektor oleh insert_transformed_to_mongo.py
+    aggregates_path = os.path.abspath("sector_aggregates.json")
+    with metrics.timer("sector_aggregates"):
+        sector_aggregates(transformed_df).toPandas().to_json(aggregates_path, orient="records", indent=4, force_ascii=False)
+    print(f"Agregat sektor disimpan ke: {aggregates_path}")
+    metrics.record_spark_stages(spark)
+    metrics.print_summary()
+    metrics.flush()
+    spark.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# Membandingkan kualitas dan latensi backend summarizer secara offline.
+#
+# Contoh:
+#   python bandingkan_backend.py --model-dir ./models/bart-large-cnn --input artikel.json
+#   python bandingkan_backend.py --model-dir ./models/bart-large-cnn --backends torch torch-int8 onnx --threads 4
+#
+# File input berupa JSON list string atau list dokumen dengan field "konten".
+# Backend pertama dipakai sebagai baseline untuk skor ROUGE.
+
+import argparse
+import json
+import os
+import time
+
+# Paksa mode offline agar tidak ada unduhan dari HuggingFace Hub
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+from rangkum_backend import BACKENDS, load_summarizer
+from rangkum_utils import summarize_batch
+
+SAMPLE_ARTICLES = [
+    "IQPlus, (19/10) - PT Bank Rakyat Indonesia Tbk (BBRI) mencatatkan laba bersih sebesar Rp45 triliun "
+    "hingga kuartal ketiga. Kenaikan laba didorong oleh pertumbuhan kredit mikro dan efisiensi biaya "
+    "operasional. Direktur Utama perseroan menyampaikan bahwa kualitas aset tetap terjaga dengan rasio NPL "
+    "di bawah tiga persen. Perseroan juga menargetkan pertumbuhan kredit sebesar sepuluh persen hingga akhir "
+    "tahun dengan fokus pada segmen UMKM. (end)",
+    "IQPlus, (19/10) - Indeks Harga Saham Gabungan ditutup melemah 0,8 persen ke level 7.050 pada perdagangan "
+    "sore ini. Pelemahan dipimpin oleh sektor energi dan bahan baku seiring turunnya harga komoditas global. "
+    "Investor asing mencatatkan penjualan bersih sebesar Rp600 miliar di pasar reguler. Analis memperkirakan "
+    "indeks masih akan bergerak fluktuatif menjelang rilis data inflasi dan keputusan suku bunga Bank Indonesia "
+    "pekan depan. (end)",
+]
+
+
+# Fungsi membaca artikel dari file JSON
+def load_articles(path):
+    if not path:
+        return SAMPLE_ARTICLES
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [d["konten"] if isinstance(d, dict) else d for d in data if d]
+
+
+# ROUGE-1 dan ROUGE-L (F1) sederhana tanpa dependensi tambahan
+def _lcs_length(a, b):
+    prev = [0] * (len(b) + 1)
+    for x in a:
+        curr = [0]
+        for j, y in enumerate(b):
+            curr.append(prev[j] + 1 if x == y else max(prev[j + 1], curr[j]))
+        prev = curr
+    return prev[-1]
+
+
+def _f1(overlap, n_pred, n_ref):
+    if not overlap or not n_pred or not n_ref:
+        return 0.0
+    precision, recall = overlap / n_pred, overlap / n_ref
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_scores(prediction, reference):
+    pred, ref = (prediction or "").lower().split(), (reference or "").lower().split()
+    ref_counts = {}
+    for token in ref:
+        ref_counts[token] = ref_counts.get(token, 0) + 1
+    overlap = 0
+    for token in pred:
+        if ref_counts.get(token, 0) > 0:
+            ref_counts[token] -= 1
+            overlap += 1
+    return {
+        "rouge1": _f1(overlap, len(pred), len(ref)),
+        "rougeL": _f1(_lcs_length(pred, ref), len(pred), len(ref)),
+    }
+
+
+def run_backend(backend, args, articles):
+    start = time.perf_counter()
+    summarizer, tokenizer = load_summarizer(backend, args.model_dir, args.threads, args.interop_threads)
+    load_seconds = time.perf_counter() - start
+
+    # Satu kali pemanasan agar waktu inisialisasi tidak ikut terukur
+    summarize_batch(summarizer, tokenizer, articles[:1], batch_size=args.batch_size)
+
+    start = time.perf_counter()
+    summaries = summarize_batch(summarizer, tokenizer, articles, batch_size=args.batch_size)
+    infer_seconds = time.perf_counter() - start
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "infer_seconds": infer_seconds,
+        "articles_per_hour": len(articles) / infer_seconds * 3600 if infer_seconds else 0.0,
+        "summaries": summaries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perbandingan kualitas/latensi backend summarizer")
+    parser.add_argument("--model-dir", required=True, help="Folder model lokal")
+    parser.add_argument("--input", help="File JSON berisi artikel (default: contoh bawaan)")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--interop-threads", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--output", help="Simpan hasil lengkap ke file JSON")
+    args = parser.parse_args()
+
+    articles = load_articles(args.input)
+    print(f"📄 {len(articles)} artikel, backend: {', '.join(args.backends)}")
+
+    results = []
+    for backend in args.backends:
+        try:
+            results.append(run_backend(backend, args, articles))
+        except Exception as e:
+            print(f"❌ Backend {backend} gagal: {e}")
+
+    if not results:
+        print("❌ Tidak ada backend yang berhasil dijalankan.")
+        return
+
+    baseline = results[0]
+    print(f"\n📊 Baseline: {baseline['backend']}")
+    print(f"{'backend':<12} {'load(s)':>8} {'infer(s)':>9} {'artikel/jam':>12} {'ROUGE-1':>8} {'ROUGE-L':>8}")
+    for result in results:
+        scores = [rouge_scores(p, r) for p, r in zip(result["summaries"], baseline["summaries"])]
+        result["rouge1"] = sum(s["rouge1"] for s in scores) / len(scores)
+        result["rougeL"] = sum(s["rougeL"] for s in scores) / len(scores)
+        print(f"{result['backend']:<12} {result['load_seconds']:>8.1f} {result['infer_seconds']:>9.2f} "
+              f"{result['articles_per_hour']:>12.0f} {result['rouge1']:>8.3f} {result['rougeL']:>8.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        print(f"\n💾 Hasil disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
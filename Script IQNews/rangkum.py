@@ -0,0 +1,222 @@
+# CLI peringkasan artikel untuk koleksi berita mana pun.
+#
+# Ruang _id artikel yang belum diringkas dibagi menjadi beberapa shard dan setiap
+# shard diproses oleh satu proses worker dengan jumlah thread torch sendiri.
+# Progres setiap shard disimpan sebagai checkpoint di MongoDB (koleksi
+# rangkum_checkpoints), sehingga jika proses berhenti di tengah jalan, run
+# berikutnya melanjutkan dari posisi terakhir dengan pembagian shard yang sama.
+#
+# Contoh:
+#   python rangkum.py --collection articles2
+#   python rangkum.py --collection articles --workers 4 --threads 2
+#   python rangkum.py --collection articles --workers 4 --reset
+#   python rangkum.py --collection articles2 --server 127.0.0.1:8766
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from mongo_access import close_clients, get_db
+from pipeline_metrics import get_metrics
+
+from rangkum_ekstraktif import METHODS as EXTRACTIVE_METHODS
+from rangkum_filter import UNSUMMARIZED_FILTER
+
+DB_NAME = "news_db"
+CHECKPOINT_COLLECTION = "rangkum_checkpoints"
+
+
+def _checkpoint_id(source, shard):
+    return f"{source}:{shard}"
+
+
+# Fungsi membagi ruang _id menjadi n shard dengan jumlah artikel yang kira-kira sama
+def plan_shards(collection, n_shards):
+    buckets = list(collection.aggregate([
+        {"$match": UNSUMMARIZED_FILTER},
+        {"$project": {"_id": 1}},
+        {"$bucketAuto": {"groupBy": "$_id", "buckets": n_shards}},
+    ]))
+    if not buckets:
+        return []
+    lowers = [None] + [b["_id"]["min"] for b in buckets[1:]]
+    uppers = lowers[1:] + [None]
+    return list(zip(lowers, uppers))
+
+
+# Fungsi memuat checkpoint yang belum selesai, atau membuat pembagian shard baru
+def load_or_create_shards(db, source, n_shards, reset=False):
+    checkpoints = db[CHECKPOINT_COLLECTION]
+    existing = list(checkpoints.find({"collection": source}).sort("shard", 1))
+
+    if existing and not reset and not all(cp.get("done") for cp in existing):
+        pending = [cp for cp in existing if not cp.get("done")]
+        print(f"🔁 Melanjutkan {len(pending)} shard dari checkpoint sebelumnya")
+        return pending
+
+    checkpoints.delete_many({"collection": source})
+    shards = plan_shards(db[source], n_shards)
+    docs = []
+    for shard, (lower, upper) in enumerate(shards):
+        docs.append({
+            "_id": _checkpoint_id(source, shard),
+            "collection": source,
+            "shard": shard,
+            "lower": lower,
+            "upper": upper,
+            "last_id": None,
+            "done": False,
+            "updated_at": datetime.now(),
+        })
+    if docs:
+        checkpoints.insert_many(docs)
+    print(f"🧩 Membuat {len(docs)} shard baru untuk koleksi {source}")
+    return docs
+
+
+def shard_query(checkpoint):
+    id_range = {}
+    if checkpoint.get("last_id") is not None:
+        id_range["$gt"] = checkpoint["last_id"]
+    elif checkpoint.get("lower") is not None:
+        id_range["$gte"] = checkpoint["lower"]
+    if checkpoint.get("upper") is not None:
+        id_range["$lt"] = checkpoint["upper"]
+    if not id_range:
+        return UNSUMMARIZED_FILTER
+    return {"$and": [UNSUMMARIZED_FILTER, {"_id": id_range}]}
+
+
+# Fungsi yang dijalankan setiap worker untuk satu shard
+def run_shard(checkpoint, options):
+    # Import di dalam worker agar model hanya dimuat di proses anak
+    from rangkum_cache import SummaryCache
+    from rangkum_pipeline import run_pipeline
+
+    shard = checkpoint["shard"]
+    metrics = get_metrics("rangkum", instance=f"{options['collection']}-{shard}")
+    db = get_db(DB_NAME)
+    checkpoints = db[CHECKPOINT_COLLECTION]
+
+    def save_checkpoint(last_id):
+        checkpoints.update_one({"_id": checkpoint["_id"]},
+                               {"$set": {"last_id": last_id, "updated_at": datetime.now()}})
+        # File metrics diperbarui bersamaan dengan checkpoint agar progres terlihat selama run
+        metrics.flush()
+
+    summarizer = tokenizer = engine = None
+    if options["server"]:
+        # Model sudah hangat di rangkum_server.py, worker ini hanya mengurus I/O
+        from rangkum_client import RemoteEngine, parse_address
+        engine = RemoteEngine(*parse_address(options["server"]))
+        print(f"🚀 Shard {shard} mulai (pid {os.getpid()}, worker {options['server']})")
+    else:
+        from rangkum_backend import load_summarizer
+        print(f"🚀 Shard {shard} mulai (pid {os.getpid()}, {options['threads']} thread)")
+        with metrics.timer("model_load", backend=options["backend"]):
+            summarizer, tokenizer = load_summarizer(options["backend"], options["model"],
+                                                    options["threads"], options["interop_threads"])
+    cache = SummaryCache(db, similarity=options["similarity"]) if options["use_cache"] else None
+    stats = run_pipeline(db[options["collection"]], summarizer, tokenizer,
+                         inference_batch_size=options["inference_batch_size"],
+                         max_tokens=options["chunk_max_tokens"],
+                         overlap_sentences=options["chunk_overlap"],
+                         read_batch_size=options["read_batch_size"],
+                         flush_size=options["flush_size"],
+                         query=shard_query(checkpoint),
+                         on_checkpoint=save_checkpoint,
+                         cache=cache,
+                         engine=engine,
+                         extractive=options["extractive"],
+                         extractive_budget=options["extractive_budget"],
+                         metrics=metrics)
+    metrics.print_summary()
+    metrics.flush()
+    if engine is not None:
+        engine.close()
+    checkpoints.update_one({"_id": checkpoint["_id"]},
+                           {"$set": {"done": True, "updated_at": datetime.now()}})
+    print(f"✅ Shard {shard} selesai: {stats['processed']} artikel")
+    return stats
+
+
+def parse_args(argv=None):
+    from rangkum_backend import BACKENDS, DEFAULT_MODEL
+
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Peringkasan artikel berita dengan shard dan checkpoint")
+    parser.add_argument("--collection", required=True, help="Koleksi sumber di news_db (mis. articles, articles2)")
+    parser.add_argument("--workers", type=int, default=1, help="Jumlah proses worker / shard")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Thread torch per worker (default: jumlah core / workers)")
+    parser.add_argument("--interop-threads", type=int, default=1)
+    parser.add_argument("--backend", default=os.environ.get("SUMMARIZER_BACKEND", "torch"), choices=BACKENDS)
+    parser.add_argument("--model", default=os.environ.get("SUMMARIZER_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--inference-batch-size", type=int, default=8)
+    parser.add_argument("--chunk-max-tokens", type=int, default=1024)
+    parser.add_argument("--chunk-overlap", type=int, default=0)
+    parser.add_argument("--extractive", default="textrank", choices=EXTRACTIVE_METHODS + ["off"],
+                        help="Metode pemilihan kalimat sebelum BART ('off' untuk menonaktifkan)")
+    parser.add_argument("--extractive-budget", type=int, default=None,
+                        help="Batas token hasil tahap ekstraktif (default: satu jendela model)")
+    parser.add_argument("--read-batch-size", type=int, default=100)
+    parser.add_argument("--flush-size", type=int, default=50)
+    parser.add_argument("--server", default=os.environ.get("SUMMARIZER_SERVER"),
+                        help="Alamat worker rangkum_server.py (host:port); jika diisi model tidak dimuat lokal")
+    parser.add_argument("--no-cache", action="store_true", help="Nonaktifkan cache ringkasan")
+    parser.add_argument("--similarity", type=float, default=0.9,
+                        help="Batas estimasi Jaccard untuk memakai ringkasan near-duplicate")
+    parser.add_argument("--reset", action="store_true", help="Abaikan checkpoint lama dan bagi ulang shard")
+    args = parser.parse_args(argv)
+    if args.threads is None:
+        args.threads = max(1, cpu_count // max(1, args.workers))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = {
+        "collection": args.collection,
+        "threads": args.threads,
+        "interop_threads": args.interop_threads,
+        "backend": args.backend,
+        "model": args.model,
+        "inference_batch_size": args.inference_batch_size,
+        "chunk_max_tokens": args.chunk_max_tokens,
+        "chunk_overlap": args.chunk_overlap,
+        "extractive": None if args.extractive == "off" else args.extractive,
+        "extractive_budget": args.extractive_budget,
+        "read_batch_size": args.read_batch_size,
+        "flush_size": args.flush_size,
+        "server": args.server,
+        "use_cache": not args.no_cache,
+        "similarity": args.similarity,
+    }
+
+    shards = load_or_create_shards(get_db(DB_NAME), args.collection, args.workers, args.reset)
+
+    if not shards:
+        print("✅ Semua artikel sudah diproses.")
+        return
+
+    start = time.perf_counter()
+    if len(shards) == 1:
+        run_shard(shards[0], options)
+    else:
+        # Tutup pool koneksi proses induk; setiap worker membuat pool sendiri
+        close_clients()
+        # "spawn" agar setiap worker memulai interpreter dan thread pool torch yang bersih
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(processes=len(shards)) as pool:
+            pool.starmap(run_shard, [(shard, options) for shard in shards])
+    close_clients()
+
+    print(f"\n✨ {len(shards)} shard selesai dalam {time.perf_counter() - start:.1f} detik")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Pemilihan backend inferensi untuk summarizer.
+#
+# Backend yang tersedia:
+#   - "torch"      : model PyTorch fp32 (perilaku awal)
+#   - "torch-int8" : dynamic int8 quantization pada layer Linear (CPU)
+#   - "onnx"       : ONNX Runtime encoder-decoder dengan KV cache (pip install optimum[onnxruntime])
+#
+# Model bisa berupa nama di HuggingFace Hub, checkpoint distilasi
+# (mis. sshleifer/distilbart-cnn-12-6), atau folder model lokal.
+#
+# Konfigurasi lewat environment variable:
+#   SUMMARIZER_BACKEND, SUMMARIZER_MODEL, SUMMARIZER_THREADS, SUMMARIZER_INTEROP_THREADS
+
+import os
+import torch
+from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+
+DEFAULT_MODEL = "facebook/bart-large-cnn"
+BACKENDS = ["torch", "torch-int8", "onnx"]
+
+
+# Fungsi mengatur jumlah thread PyTorch
+def configure_threads(num_threads=None, interop_threads=None):
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads:
+        try:
+            torch.set_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Hanya bisa di-set sekali, sebelum operasi paralel pertama
+            print(f"⚠️ Interop threads tidak bisa diubah: {e}")
+
+
+def _load_onnx(model_name, num_threads=None, interop_threads=None):
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from optimum.pipelines import pipeline as ort_pipeline
+
+    options = ort.SessionOptions()
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    if interop_threads:
+        options.inter_op_num_threads = interop_threads
+        options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+    # Export otomatis jika folder belum berisi file .onnx
+    needs_export = not (os.path.isdir(model_name)
+                        and any(f.endswith(".onnx") for f in os.listdir(model_name)))
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=needs_export, use_cache=True,
+                                                 session_options=options)
+    return ort_pipeline("summarization", model=model, tokenizer=tokenizer, accelerator="ort"), tokenizer
+
+
+# Fungsi memuat summarizer sesuai backend yang dipilih
+def load_summarizer(backend="torch", model_name=DEFAULT_MODEL, num_threads=None, interop_threads=None):
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: {backend} (pilihan: {', '.join(BACKENDS)})")
+
+    print(f"🧠 Memuat model {model_name} dengan backend {backend}...")
+    configure_threads(num_threads, interop_threads)
+
+    if backend == "onnx":
+        return _load_onnx(model_name, num_threads, interop_threads)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    model.eval()
+    device = 0 if torch.cuda.is_available() else -1
+
+    if backend == "torch-int8":
+        # Quantization dinamis hanya berjalan di CPU
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        device = -1
+
+    return pipeline("summarization", model=model, tokenizer=tokenizer, device=device), tokenizer
+
+
+# Fungsi memuat summarizer dari environment variable
+def load_summarizer_from_env():
+    threads = os.environ.get("SUMMARIZER_THREADS")
+    interop = os.environ.get("SUMMARIZER_INTEROP_THREADS")
+    return load_summarizer(
+        backend=os.environ.get("SUMMARIZER_BACKEND", "torch"),
+        model_name=os.environ.get("SUMMARIZER_MODEL", DEFAULT_MODEL),
+        num_threads=int(threads) if threads else None,
+        interop_threads=int(interop) if interop else None,
+    )
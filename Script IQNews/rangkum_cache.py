@@ -0,0 +1,120 @@
+# Cache ringkasan persisten untuk artikel IQNews.
+#
+# IQPlus sering menerbitkan ulang berita yang sama (atau hanya sedikit diubah) di
+# feed market dan stock. Cache ini menyimpan ringkasan di koleksi ringkasan_cache:
+#   - exact match : key = SHA-256 dari teks hasil clean_text
+#   - near match  : MinHash dari shingle 3 kata + LSH (band disimpan sebagai array
+#                   ber-index), kandidat dicek ulang dengan estimasi Jaccard
+# Artikel yang cocok memakai ringkasan yang sudah ada tanpa inferensi model.
+
+import hashlib
+from datetime import datetime
+import numpy as np
+
+CACHE_COLLECTION = "ringkasan_cache"
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+
+_rng = np.random.RandomState(42)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64)
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _shingle_hashes(text):
+    words = text.lower().split()
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    # Hash 32-bit agar perkalian dengan koefisien 31-bit tidak overflow uint64
+    return np.array([int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+                     for s in shingles], dtype=np.uint64)
+
+
+# Fungsi menghitung signature MinHash (vektor NUM_PERM nilai minimum)
+def minhash_signature(text):
+    hashes = _shingle_hashes(text)
+    values = (hashes[:, None] * _PERM_A[None, :] + _PERM_B[None, :]) % np.uint64(_PRIME)
+    return values.min(axis=0)
+
+
+def lsh_bands(signature):
+    return [f"{band}:{hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).hexdigest()}"
+            for band in range(BANDS)]
+
+
+def estimated_jaccard(sig_a, sig_b):
+    return float(np.mean(np.asarray(sig_a, dtype=np.uint64) == np.asarray(sig_b, dtype=np.uint64)))
+
+
+class SummaryCache:
+    """
+    Persistent summary cache keyed by cleaned-text hash with MinHash/LSH near-duplicate lookup
+    """
+
+    def __init__(self, db, similarity=0.9, max_candidates=20):
+        self.collection = db[CACHE_COLLECTION]
+        self.collection.create_index("lsh_bands")
+        self.similarity = similarity
+        self.max_candidates = max_candidates
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+
+    # Fungsi mencari ringkasan; mengembalikan (ringkasan, key) dengan key dipakai untuk store()
+    def lookup(self, cleaned):
+        digest = text_digest(cleaned)
+        doc = self.collection.find_one({"_id": digest}, {"ringkasan": 1})
+        if doc:
+            self.stats["exact_hits"] += 1
+            return doc["ringkasan"], None
+
+        signature = minhash_signature(cleaned)
+        bands = lsh_bands(signature)
+        candidates = self.collection.find({"lsh_bands": {"$in": bands}},
+                                          {"ringkasan": 1, "minhash": 1}).limit(self.max_candidates)
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            score = estimated_jaccard(signature, candidate["minhash"])
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is not None and best_score >= self.similarity:
+            self.stats["near_hits"] += 1
+            # Simpan juga sebagai exact match agar lookup berikutnya lebih murah
+            self._save(digest, signature, bands, best["ringkasan"], near_of=best["_id"])
+            return best["ringkasan"], None
+
+        self.stats["misses"] += 1
+        return None, (digest, signature, bands)
+
+    def store(self, key, summary):
+        if key is None or not summary:
+            return
+        digest, signature, bands = key
+        self._save(digest, signature, bands, summary)
+
+    def _save(self, digest, signature, bands, summary, near_of=None):
+        self.collection.update_one(
+            {"_id": digest},
+            {"$setOnInsert": {
+                "ringkasan": summary,
+                "minhash": [int(v) for v in signature],
+                "lsh_bands": bands,
+                "near_of": near_of,
+                "created_at": datetime.now(),
+            }},
+            upsert=True,
+        )
+
+    def report(self):
+        total = sum(self.stats.values())
+        hits = self.stats["exact_hits"] + self.stats["near_hits"]
+        rate = hits / total * 100 if total else 0.0
+        print(f"📦 Cache ringkasan: {self.stats['exact_hits']} exact, {self.stats['near_hits']} near-duplicate, "
+              f"{self.stats['misses']} miss (hit rate {rate:.1f}%, {hits} inferensi dihemat)")
+        return dict(self.stats, hit_rate=rate)
@@ -0,0 +1,88 @@
+# Client untuk worker peringkasan (rangkum_server.py).
+#
+# Contoh pemakaian ad-hoc:
+#   from rangkum_client import summarize_texts
+#   summarize_texts(["IQPlus, (19/10) - ..."])
+
+import json
+import socket
+import threading
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+
+
+class RemoteEngine:
+    """
+    Pipeline engine that sends cleaned articles to a running summarization worker
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=600):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._file = self._sock.makefile("rwb")
+
+    def _request(self, payload):
+        with self._lock:
+            if self._sock is None:
+                self._connect()
+            try:
+                self._file.write((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+                self._file.flush()
+                line = self._file.readline()
+            except OSError:
+                self.close()
+                raise
+        if not line:
+            self.close()
+            raise ConnectionError("Koneksi ke worker peringkasan terputus")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    # Teks dibersihkan dan di-chunk oleh worker, jadi di sisi client cukup diteruskan
+    def prepare(self, text):
+        return text
+
+    def chunk_count(self, prepared):
+        return 1
+
+    def summarize(self, prepared_list):
+        return self._request({"texts": prepared_list})["summaries"]
+
+    def report(self):
+        # Statistik tahap ekstraktif ada di sisi worker (lihat stats())
+        return None
+
+    def stats(self):
+        return self._request({"cmd": "stats"})
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._file = None
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or DEFAULT_HOST, int(port) if port else DEFAULT_PORT
+
+
+# Fungsi ringkas untuk tools ad-hoc
+def summarize_texts(texts, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    engine = RemoteEngine(host, port)
+    try:
+        return engine.summarize(list(texts))
+    finally:
+        engine.close()
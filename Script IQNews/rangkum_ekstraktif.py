@@ -0,0 +1,96 @@
+# Tahap ekstraktif sebelum BART.
+#
+# Artikel panjang dipangkas dengan memilih kalimat paling informatif sampai satu
+# jendela model, sehingga umumnya cukup satu panggilan abstraktif per artikel.
+# Skor kalimat dihitung dengan TF-IDF (kemiripan ke centroid dokumen) atau
+# TextRank (PageRank di atas graf kemiripan kosinus antar kalimat), semuanya
+# dengan operasi matriks NumPy.
+
+import re
+import numpy as np
+
+METHODS = ["textrank", "tfidf"]
+WORD_PATTERN = re.compile(r"\w+")
+
+
+# Fungsi membangun matriks TF-IDF (baris = kalimat) yang sudah dinormalisasi L2
+def tfidf_matrix(sentences):
+    tokenized = [WORD_PATTERN.findall(s.lower()) for s in sentences]
+    vocab = {}
+    for words in tokenized:
+        for word in words:
+            vocab.setdefault(word, len(vocab))
+
+    tf = np.zeros((len(sentences), max(len(vocab), 1)), dtype=np.float32)
+    for row, words in enumerate(tokenized):
+        for word in words:
+            tf[row, vocab[word]] += 1
+
+    df = (tf > 0).sum(axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + df)) + 1
+    weights = tf * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return weights / norms
+
+
+def score_sentences(sentences, method="textrank", damping=0.85, iterations=50, tol=1e-6):
+    matrix = tfidf_matrix(sentences)
+    if method == "tfidf":
+        centroid = matrix.mean(axis=0)
+        return matrix @ centroid
+
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    row_sums[row_sums == 0] = 1
+    transition = similarity / row_sums
+
+    n = len(sentences)
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+
+# Fungsi memilih index kalimat dengan skor tertinggi sampai budget token terpenuhi.
+# Kalimat pertama (lead berita) selalu disertakan jika keep_lead aktif, juga jika lebih
+# panjang dari budget (pemanggil yang memotongnya; lihat chunk_text_by_tokens).
+# Hasil tidak pernah kosong. Urutan kalimat asli dipertahankan.
+def select_sentences(sentences, lengths, budget, method="textrank", keep_lead=True):
+    if sum(lengths) <= budget:
+        return list(range(len(sentences)))
+
+    scores = score_sentences(sentences, method)
+    selected, used = set(), 0
+    if keep_lead:
+        selected.add(0)
+        used += lengths[0]
+    for idx in np.argsort(-scores, kind="stable"):
+        idx = int(idx)
+        if idx in selected or used + lengths[idx] > budget:
+            continue
+        selected.add(idx)
+        used += lengths[idx]
+    if not selected:
+        # Semua kalimat lebih panjang dari budget: ambil kalimat dengan skor tertinggi
+        selected.add(int(np.argmax(scores)))
+    return sorted(selected)
+
+
+def new_stats():
+    return {"articles": 0, "reduced": 0, "tokens_in": 0, "tokens_out": 0}
+
+
+def report(stats):
+    if not stats["articles"]:
+        return stats
+    removed = stats["tokens_in"] - stats["tokens_out"]
+    pct = removed / stats["tokens_in"] * 100 if stats["tokens_in"] else 0.0
+    print(f"✂️ Tahap ekstraktif: {stats['reduced']}/{stats['articles']} artikel dipangkas, "
+          f"{removed} dari {stats['tokens_in']} token dibuang ({pct:.1f}%)")
+    return dict(stats, removed_pct=pct)
@@ -0,0 +1,16 @@
+# Filter artikel yang belum diringkas, dipakai rangkum_pipeline.py, rangkum.py, dan
+# orchestrator.py. Sengaja tanpa dependensi (torch/transformers) agar bisa diimpor di mana saja.
+
+import os
+
+# Batas percobaan untuk artikel yang ringkasannya gagal sebelum dilewati di run berikutnya
+MAX_SUMMARY_ATTEMPTS = int(os.environ.get("RANGKUM_MAX_ATTEMPTS", "3"))
+
+# Artikel yang belum punya ringkasan: field tidak ada, null, atau hanya spasi. Artikel berkonten
+# kosong (ringkasan_status "empty") dan artikel yang sudah gagal MAX_SUMMARY_ATTEMPTS kali
+# (ringkasan_status "failed") tidak dibaca ulang.
+UNSUMMARIZED_FILTER = {"$and": [
+    {"$or": [{"ringkasan": None}, {"ringkasan": {"$regex": r"^\s*$"}}]},
+    {"ringkasan_status": {"$ne": "empty"}},
+    {"ringkasan_attempts": {"$not": {"$gte": MAX_SUMMARY_ATTEMPTS}}},
+]}
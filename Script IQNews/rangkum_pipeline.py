@@ -0,0 +1,246 @@
+# Pipeline producer/consumer untuk peringkasan artikel.
+#
+# Tahapan berjalan di thread terpisah dan dihubungkan oleh queue berukuran terbatas:
+#   1. reader  : mengambil artikel yang belum diringkas langsung dari MongoDB (filter di server,
+#                projection hanya "konten")
+#   2. cleaner : membersihkan teks, mengecek cache ringkasan (opsional), lalu memecahnya
+#                menjadi chunk token
+#   3. model   : inferensi batch (thread utama), mengambil artikel sebanyak yang tersedia di queue
+#   4. writer  : mengumpulkan hasil dan menyimpannya dengan bulk_write, lalu memanggil
+#                on_checkpoint(_id) untuk posisi yang sudah aman dilanjutkan
+# Dengan begitu model tidak menunggu I/O MongoDB maupun pembersihan teks.
+# Jika metrics (pipeline_metrics.Metrics) diberikan, setiap tahap dan setiap artikel dicatat.
+
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from pymongo import UpdateOne
+
+from rangkum_filter import UNSUMMARIZED_FILTER
+from rangkum_utils import LocalEngine, clean_text
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from mongo_access import bulk_write, find_batched
+
+_STOP = object()
+
+
+def _reader(collection, query, out_queue, read_batch_size, read_ids, metrics):
+    try:
+        cursor = find_batched(collection, query, {"konten": 1}, read_batch_size, sort=[("_id", 1)])
+        for doc in cursor:
+            read_ids.append(doc["_id"])
+            out_queue.put(doc)
+            if metrics is not None:
+                metrics.count("articles_read_total")
+    except Exception as e:
+        print(f"❌ Error saat membaca artikel: {e}")
+    finally:
+        out_queue.put(_STOP)
+
+
+def _cleaner(in_queue, out_queue, write_queue, engine, cache, metrics):
+    while True:
+        doc = in_queue.get()
+        if doc is _STOP:
+            out_queue.put(_STOP)
+            return
+        doc_id = doc["_id"]
+        original_text = doc.get("konten", "")
+        if not original_text or not original_text.strip():
+            print(f"⚠️ Kosong/null pada ID: {doc_id}, ditandai empty.")
+            write_queue.put((doc_id, None, "empty"))
+            if metrics is not None:
+                metrics.count("articles_total", status="empty")
+            continue
+        try:
+            start = time.perf_counter()
+            cleaned = clean_text(original_text)
+            cache_key = None
+            if cache is not None:
+                cached, cache_key = cache.lookup(cleaned)
+                if metrics is not None:
+                    metrics.count("cache_lookups_total", result="hit" if cached else "miss")
+                if cached:
+                    write_queue.put((doc_id, cached, "ok"))
+                    if metrics is not None:
+                        metrics.count("articles_total", status="cached")
+                    continue
+            prepared = engine.prepare(cleaned)
+            out_queue.put((doc_id, prepared, cache_key))
+            if metrics is not None:
+                elapsed = time.perf_counter() - start
+                metrics.observe("stage_seconds", elapsed, stage="prepare", status="ok")
+                metrics.event("prepare", article=str(doc_id), seconds=round(elapsed, 6),
+                              chars=len(original_text), chunks=engine.chunk_count(prepared))
+        except Exception as e:
+            print(f"⚠️ Error saat menyiapkan ID {doc_id}: {e}")
+            write_queue.put((doc_id, None, "failed"))
+            if metrics is not None:
+                metrics.count("articles_total", status="prepare_error")
+
+
+# Fungsi membangun update untuk satu artikel; kegagalan menambah hitungan percobaan
+def _summary_update(summary, status):
+    update = {"$set": {"ringkasan": summary, "ringkasan_status": status}}
+    if status == "failed":
+        update["$inc"] = {"ringkasan_attempts": 1}
+    return update
+
+
+def _writer(collection, in_queue, flush_size, flush_interval, stats, read_ids, on_checkpoint, metrics):
+    ops = []
+    op_ids = []
+    flushed = set()
+    last_flush = time.monotonic()
+
+    def flush():
+        nonlocal ops, op_ids, last_flush
+        if ops:
+            try:
+                start = time.perf_counter()
+                result = bulk_write(collection, ops)
+                stats["written"] += result["modified"]
+                if metrics is not None:
+                    metrics.observe("stage_seconds", time.perf_counter() - start, stage="bulk_write", status="ok")
+                    metrics.count("documents_written_total", result["modified"])
+                    metrics.count("bulk_write_retries_total", result["retries"])
+                print(f"💾 {len(ops)} ringkasan disimpan (bulk_write)")
+                flushed.update(op_ids)
+                _advance_checkpoint()
+            except Exception as e:
+                print(f"❌ Error saat bulk_write: {e}")
+                if metrics is not None:
+                    metrics.count("bulk_write_errors_total")
+        ops = []
+        op_ids = []
+        last_flush = time.monotonic()
+
+    # Checkpoint = _id terbesar yang semua _id sebelumnya (urutan baca) sudah tersimpan
+    def _advance_checkpoint():
+        watermark = None
+        while read_ids and read_ids[0] in flushed:
+            watermark = read_ids.popleft()
+            flushed.discard(watermark)
+        if watermark is not None and on_checkpoint:
+            try:
+                on_checkpoint(watermark)
+            except Exception as e:
+                print(f"⚠️ Gagal menyimpan checkpoint: {e}")
+
+    while True:
+        try:
+            item = in_queue.get(timeout=flush_interval)
+        except queue.Empty:
+            flush()
+            continue
+        if item is _STOP:
+            flush()
+            return
+        doc_id, summary, status = item
+        ops.append(UpdateOne({"_id": doc_id}, _summary_update(summary, status)))
+        op_ids.append(doc_id)
+        if len(ops) >= flush_size or time.monotonic() - last_flush >= flush_interval:
+            flush()
+
+
+# Fungsi mengambil artikel dari queue: blok untuk artikel pertama, lalu ambil
+# sisanya yang sudah siap tanpa menunggu, sampai jumlah chunk mencukupi satu batch
+def _collect_articles(in_queue, engine, max_chunks):
+    first = in_queue.get()
+    if first is _STOP:
+        return [], True
+    items, n_chunks = [first], engine.chunk_count(first[1])
+    while n_chunks < max_chunks:
+        try:
+            item = in_queue.get_nowait()
+        except queue.Empty:
+            break
+        if item is _STOP:
+            return items, True
+        items.append(item)
+        n_chunks += engine.chunk_count(item[1])
+    return items, False
+
+
+# Fungsi utama menjalankan pipeline peringkasan untuk satu koleksi.
+# Secara default model lokal dipakai (LocalEngine); engine lain (mis. RemoteEngine dari
+# rangkum_client.py) bisa diberikan lewat parameter engine.
+def run_pipeline(collection, summarizer, tokenizer, inference_batch_size=8, max_tokens=None,
+                 overlap_sentences=0, read_batch_size=100, queue_size=64, flush_size=50,
+                 flush_interval=5.0, query=None, on_checkpoint=None, cache=None, engine=None,
+                 extractive=None, extractive_budget=None, metrics=None):
+    query = UNSUMMARIZED_FILTER if query is None else query
+    if engine is None:
+        engine = LocalEngine(summarizer, tokenizer, inference_batch_size, max_tokens, overlap_sentences,
+                             extractive, extractive_budget)
+    raw_queue = queue.Queue(maxsize=queue_size)
+    prepared_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size * 4)
+    stats = {"processed": 0, "written": 0}
+    read_ids = deque()
+
+    threads = [
+        threading.Thread(target=_reader, args=(collection, query, raw_queue, read_batch_size, read_ids, metrics),
+                         daemon=True),
+        threading.Thread(target=_cleaner, args=(raw_queue, prepared_queue, write_queue, engine, cache, metrics),
+                         daemon=True),
+    ]
+    writer = threading.Thread(target=_writer, args=(collection, write_queue, flush_size, flush_interval, stats,
+                                                     read_ids, on_checkpoint, metrics), daemon=True)
+    for thread in threads + [writer]:
+        thread.start()
+
+    start = time.perf_counter()
+    # Writer selalu dihentikan dan di-join, juga jika inference gagal (mis. worker server
+    # restart), agar ringkasan yang sudah di queue tetap tersimpan sebelum error diteruskan
+    try:
+        done = False
+        while not done:
+            items, done = _collect_articles(prepared_queue, engine, inference_batch_size * 2)
+            if not items:
+                break
+            print(f"\n📄 Memproses {len(items)} artikel sekaligus...")
+            batch_start = time.perf_counter()
+            summaries = engine.summarize([prepared for _, prepared, _ in items])
+            if metrics is not None:
+                batch_seconds = time.perf_counter() - batch_start
+                metrics.observe("stage_seconds", batch_seconds, stage="inference", status="ok")
+                metrics.observe("inference_batch_articles", len(items), buckets=(1, 2, 4, 8, 16, 32, 64))
+                metrics.gauge("prepared_queue_depth", prepared_queue.qsize())
+            for (doc_id, _, cache_key), summary in zip(items, summaries):
+                if not summary:
+                    print(f"⚠️ Ringkasan gagal untuk ID {doc_id}, ditandai failed.")
+                elif cache is not None:
+                    cache.store(cache_key, summary)
+                write_queue.put((doc_id, summary, "ok") if summary else (doc_id, None, "failed"))
+                if metrics is not None:
+                    metrics.count("articles_total", status="summarized" if summary else "failed")
+                    # Waktu batch dibagi rata sebagai perkiraan biaya per artikel
+                    metrics.event("summarize", article=str(doc_id), batch_size=len(items),
+                                  seconds=round(batch_seconds / len(items), 6), ok=bool(summary))
+            stats["processed"] += len(items)
+
+        for thread in threads:
+            thread.join()
+    except Exception as e:
+        print(f"❌ Pipeline berhenti: {e}. Menyimpan ringkasan yang sudah selesai...")
+        if metrics is not None:
+            metrics.count("pipeline_errors_total")
+        raise
+    finally:
+        write_queue.put(_STOP)
+        writer.join()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Semua artikel sudah diproses. {stats['processed']} artikel diringkas, "
+          f"{stats['written']} dokumen diperbarui dalam {elapsed:.1f} detik.")
+    if cache is not None:
+        stats["cache"] = cache.report()
+    extractive_stats = engine.report()
+    if extractive_stats:
+        stats["extractive"] = extractive_stats
+    return stats
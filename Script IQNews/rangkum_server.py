@@ -0,0 +1,176 @@
+# Worker peringkasan yang berjalan terus (warm model).
+#
+# Model dimuat sekali, lalu menerima request lewat socket TCP lokal dengan protokol
+# JSON per baris:
+#   request : {"texts": ["artikel 1", "artikel 2", ...]}
+#   response: {"summaries": ["ringkasan 1", "ringkasan 2", ...]}
+#   request : {"cmd": "stats"}  -> statistik worker
+# Request dari banyak client (feed market, feed stock, tools ad-hoc) dikumpulkan oleh
+# satu thread batcher dan diringkas bersama dalam satu batch model.
+#
+# Contoh:
+#   python rangkum_server.py --port 8766 --threads 8
+#   python rangkum.py --collection articles2 --server 127.0.0.1:8766
+
+import argparse
+import json
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+
+from rangkum_backend import BACKENDS, DEFAULT_MODEL, load_summarizer
+from rangkum_client import DEFAULT_HOST, DEFAULT_PORT
+from rangkum_ekstraktif import METHODS as EXTRACTIVE_METHODS
+from rangkum_utils import LocalEngine
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from pipeline_metrics import get_metrics
+
+
+class _PendingRequest:
+    def __init__(self, prepared):
+        self.prepared = prepared
+        self.summaries = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class Batcher:
+    """
+    Collects pending requests from all connections and summarizes them together
+    """
+
+    def __init__(self, engine, max_chunks=16, max_wait=0.05, metrics=None):
+        self.engine = engine
+        self.metrics = metrics
+        self.max_chunks = max_chunks
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.stats = {"requests": 0, "articles": 0, "batches": 0, "busy_seconds": 0.0}
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, texts):
+        # Tokenisasi dilakukan di thread koneksi agar batcher hanya menjalankan model;
+        # engine.prepare aman dipanggil paralel (statistik ekstraktif dijaga lock)
+        request = _PendingRequest([self.engine.prepare(text or "") for text in texts])
+        self.requests.put(request)
+        request.done.wait()
+        if request.error:
+            raise RuntimeError(request.error)
+        return request.summaries
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        n_chunks = sum(self.engine.chunk_count(p) for p in batch[0].prepared)
+        deadline = time.monotonic() + self.max_wait
+        while n_chunks < self.max_chunks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            n_chunks += sum(self.engine.chunk_count(p) for p in request.prepared)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            prepared = [p for request in batch for p in request.prepared]
+            start = time.perf_counter()
+            try:
+                summaries = self.engine.summarize(prepared) if prepared else []
+                offset = 0
+                for request in batch:
+                    request.summaries = summaries[offset:offset + len(request.prepared)]
+                    offset += len(request.prepared)
+            except Exception as e:
+                for request in batch:
+                    request.error = str(e)
+            elapsed = time.perf_counter() - start
+            self.stats["busy_seconds"] += elapsed
+            self.stats["requests"] += len(batch)
+            self.stats["articles"] += len(prepared)
+            self.stats["batches"] += 1
+            if self.metrics is not None:
+                status = "error" if batch[0].error else "ok"
+                self.metrics.observe("stage_seconds", elapsed, stage="inference", status=status)
+                self.metrics.observe("inference_batch_articles", len(prepared), buckets=(1, 2, 4, 8, 16, 32, 64))
+                self.metrics.observe("batch_requests", len(batch), buckets=(1, 2, 4, 8, 16))
+                self.metrics.count("articles_total", len(prepared), status=status)
+                self.metrics.flush()
+            for request in batch:
+                request.done.set()
+
+
+class SummarizeHandler(socketserver.StreamRequestHandler):
+    batcher = None
+
+    def _reply(self, payload):
+        self.wfile.write((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle(self):
+        # Satu koneksi bisa mengirim banyak request berurutan
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+                if message.get("cmd") == "stats":
+                    self._reply(dict(self.batcher.stats, pid=os.getpid(),
+                                     extractive=self.batcher.engine.stats_snapshot()))
+                    continue
+                self._reply({"summaries": self.batcher.submit(message.get("texts", []))})
+            except Exception as e:
+                self._reply({"error": str(e)})
+
+
+class ThreadingSummarizeServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker peringkasan dengan model yang tetap dimuat")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--backend", default=os.environ.get("SUMMARIZER_BACKEND", "torch"), choices=BACKENDS)
+    parser.add_argument("--model", default=os.environ.get("SUMMARIZER_MODEL", DEFAULT_MODEL))
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--interop-threads", type=int, default=None)
+    parser.add_argument("--inference-batch-size", type=int, default=8)
+    parser.add_argument("--chunk-max-tokens", type=int, default=1024)
+    parser.add_argument("--chunk-overlap", type=int, default=0)
+    parser.add_argument("--extractive", default="textrank", choices=EXTRACTIVE_METHODS + ["off"])
+    parser.add_argument("--extractive-budget", type=int, default=None)
+    parser.add_argument("--max-wait-ms", type=float, default=50,
+                        help="Waktu tunggu maksimum untuk mengumpulkan request lain ke batch yang sama")
+    args = parser.parse_args()
+
+    summarizer, tokenizer = load_summarizer(args.backend, args.model, args.threads, args.interop_threads)
+    engine = LocalEngine(summarizer, tokenizer, args.inference_batch_size,
+                         args.chunk_max_tokens, args.chunk_overlap,
+                         None if args.extractive == "off" else args.extractive, args.extractive_budget)
+    SummarizeHandler.batcher = Batcher(engine, max_chunks=args.inference_batch_size * 2,
+                                       max_wait=args.max_wait_ms / 1000,
+                                       metrics=get_metrics("rangkum_server", instance=args.port))
+
+    server = ThreadingSummarizeServer((args.host, args.port), SummarizeHandler)
+    print(f"🚀 Worker peringkasan berjalan di {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Worker peringkasan dihentikan")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import re
+import threading
+import torch
+
+from rangkum_ekstraktif import new_stats, report as report_extractive, select_sentences
+
+# Fungsi membersihkan teks
+def clean_text(text):
+    text = re.sub(r"\(.*?\)", "", text)
+    text = re.sub(r"IQPlus,|\"|“|”|‘|’|\(end\)", "", text)
+    return text.strip()
+
+# Pemisah kalimat: titik/tanda seru/tanda tanya yang diikuti spasi
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+# Fungsi membagi teks menjadi chunk berdasarkan jumlah token model.
+# Kalimat utuh dikemas sampai batas max_tokens (termasuk token spesial),
+# dengan opsi overlap beberapa kalimat terakhir ke chunk berikutnya.
+# Hasil tokenisasi disimpan di setiap chunk agar bisa langsung dipakai generate().
+# Jika extractive diisi ("textrank"/"tfidf"), kalimat paling informatif dipilih lebih
+# dulu sampai extractive_budget token (default: satu jendela model).
+def chunk_text_by_tokens(text, tokenizer, max_tokens=None, overlap_sentences=0,
+                         extractive=None, extractive_budget=None, stats=None):
+    if max_tokens is None:
+        max_tokens = min(tokenizer.model_max_length, 1024)
+    budget = max_tokens - tokenizer.num_special_tokens_to_add()
+
+    sentences = [s for s in SENTENCE_SPLIT.split(text) if s.strip()]
+    if not sentences:
+        return []
+    # Spasi di depan agar tokenisasi per kalimat sama dengan tokenisasi teks utuh (BPE)
+    sentence_ids = tokenizer([" " + s if i else s for i, s in enumerate(sentences)],
+                             add_special_tokens=False)["input_ids"]
+
+    if extractive:
+        # Kalimat yang lebih panjang dari budget (mis. teks tanpa tanda baca) dipecah dulu
+        # menjadi potongan seukuran budget, agar tetap bisa dinilai dan dipilih
+        piece_size = min(budget, extractive_budget or budget)
+        units, unit_ids = [], []
+        for sentence, ids in zip(sentences, sentence_ids):
+            if len(ids) <= piece_size:
+                units.append(sentence)
+                unit_ids.append(ids)
+                continue
+            for start in range(0, len(ids), piece_size):
+                piece = ids[start:start + piece_size]
+                units.append(tokenizer.decode(piece, skip_special_tokens=True))
+                unit_ids.append(piece)
+        sentences, sentence_ids = units, unit_ids
+        lengths = [len(ids) for ids in sentence_ids]
+        keep = select_sentences(sentences, lengths, extractive_budget or budget, extractive)
+        if stats is not None:
+            stats["articles"] += 1
+            stats["reduced"] += len(keep) < len(sentences)
+            stats["tokens_in"] += sum(lengths)
+            stats["tokens_out"] += sum(lengths[i] for i in keep)
+        sentence_ids = [sentence_ids[i] for i in keep]
+
+    # Kalimat yang lebih panjang dari budget dipotong per budget, bukan dibuang diam-diam
+    pieces = []
+    for ids in sentence_ids:
+        for start in range(0, len(ids), budget):
+            pieces.append(ids[start:start + budget])
+
+    chunks = []
+    current = []
+    for ids in pieces:
+        if current and sum(len(p) for p in current) + len(ids) > budget:
+            chunks.append(current)
+            current = current[-overlap_sentences:] if overlap_sentences else []
+            # Overlap tidak boleh membuat chunk baru melebihi budget
+            while current and sum(len(p) for p in current) + len(ids) > budget:
+                current = current[1:]
+        current.append(ids)
+    if current:
+        chunks.append(current)
+
+    result = []
+    for chunk in chunks:
+        flat = [token for piece in chunk for token in piece]
+        result.append({
+            "text": tokenizer.decode(flat, skip_special_tokens=True).strip(),
+            "input_ids": tokenizer.build_inputs_with_special_tokens(flat),
+        })
+    return result
+
+# Fungsi menjalankan generate() langsung dari input_ids yang sudah di-cache
+def _generate_from_ids(summarizer, tokenizer, ids_batch):
+    encoded = tokenizer.pad({"input_ids": ids_batch}, return_tensors="pt")
+    encoded = {k: v.to(summarizer.model.device) for k, v in encoded.items()}
+    with torch.no_grad():
+        output = summarizer.model.generate(**encoded, max_length=250, min_length=50, do_sample=False)
+    return tokenizer.batch_decode(output, skip_special_tokens=True)
+
+# Fungsi meringkas satu chunk (dipakai sebagai fallback jika satu batch gagal)
+def _summarize_single(summarizer, tokenizer, input_ids):
+    try:
+        return _generate_from_ids(summarizer, tokenizer, [input_ids])[0]
+    except Exception as e:
+        print(f"⚠️ Error saat meringkas chunk: {e}")
+        return None
+
+# Fungsi menyiapkan satu artikel: membersihkan teks lalu memecahnya menjadi chunk token.
+# Mengembalikan (ringkasan_langsung, daftar_input_ids); ringkasan_langsung terisi
+# jika teks terlalu pendek sehingga tidak perlu melewati model.
+def prepare_article(text, tokenizer, max_tokens=None, overlap_sentences=0,
+                    extractive=None, extractive_budget=None, stats=None):
+    cleaned = clean_text(text)
+    if len(cleaned) < 30:
+        print("⚠️ Teks terlalu pendek, tidak diringkas.")
+        return cleaned, []
+    chunks = chunk_text_by_tokens(cleaned, tokenizer, max_tokens, overlap_sentences,
+                                  extractive, extractive_budget, stats)
+    return None, [chunk["input_ids"] for chunk in chunks]
+
+# Fungsi meringkas artikel yang sudah disiapkan oleh prepare_article.
+# Chunk dari semua artikel dikumpulkan, diurutkan berdasarkan panjang token
+# (agar padding dalam satu batch minimal), diringkas per batch, lalu
+# dikelompokkan kembali per artikel sesuai urutan chunk aslinya.
+def summarize_prepared(summarizer, tokenizer, prepared, batch_size=8):
+    results = [direct for direct, _ in prepared]
+    chunk_refs = []  # (index artikel, index chunk, input_ids chunk)
+
+    for article_idx, (direct, chunk_ids) in enumerate(prepared):
+        if direct is not None:
+            continue
+        for chunk_idx, ids in enumerate(chunk_ids):
+            chunk_refs.append((article_idx, chunk_idx, ids))
+
+    if not chunk_refs:
+        return results
+
+    # Bucket berdasarkan panjang token (memakai hasil tokenisasi yang sudah di-cache)
+    order = sorted(range(len(chunk_refs)), key=lambda i: len(chunk_refs[i][2]))
+
+    chunk_summaries = {}
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start:start + batch_size]
+        batch_ids = [chunk_refs[i][2] for i in batch_idx]
+        try:
+            summaries = _generate_from_ids(summarizer, tokenizer, batch_ids)
+        except Exception as e:
+            print(f"⚠️ Error saat meringkas batch, diulang per chunk: {e}")
+            summaries = [_summarize_single(summarizer, tokenizer, ids) for ids in batch_ids]
+        for i, summary in zip(batch_idx, summaries):
+            article_idx, chunk_idx, _ = chunk_refs[i]
+            chunk_summaries[(article_idx, chunk_idx)] = summary
+
+    # Susun kembali ringkasan per artikel
+    grouped = {}
+    for (article_idx, chunk_idx), summary in sorted(chunk_summaries.items()):
+        if summary:
+            grouped.setdefault(article_idx, []).append(summary)
+    for article_idx in {ref[0] for ref in chunk_refs}:
+        results[article_idx] = " ".join(grouped.get(article_idx, []))
+
+    return results
+
+# Fungsi meringkas banyak artikel sekaligus secara batch
+def summarize_batch(summarizer, tokenizer, texts, batch_size=8, max_tokens=None, overlap_sentences=0):
+    prepared = [prepare_article(text, tokenizer, max_tokens, overlap_sentences) for text in texts]
+    return summarize_prepared(summarizer, tokenizer, prepared, batch_size)
+
+class LocalEngine:
+    """
+    In-process summarizer: token chunking plus batched inference on the loaded model
+    """
+
+    def __init__(self, summarizer, tokenizer, batch_size=8, max_tokens=None, overlap_sentences=0,
+                 extractive=None, extractive_budget=None):
+        self.summarizer = summarizer
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.overlap_sentences = overlap_sentences
+        self.extractive = extractive
+        self.extractive_budget = extractive_budget
+        self.extractive_stats = new_stats()
+        # prepare() dipanggil dari banyak thread (cleaner pipeline, koneksi server)
+        self._stats_lock = threading.Lock()
+
+    def prepare(self, text):
+        # Statistik dihitung per artikel lalu digabung di bawah lock
+        stats = new_stats()
+        prepared = prepare_article(text, self.tokenizer, self.max_tokens, self.overlap_sentences,
+                                   self.extractive, self.extractive_budget, stats)
+        with self._stats_lock:
+            for key, value in stats.items():
+                self.extractive_stats[key] += value
+        return prepared
+
+    def stats_snapshot(self):
+        with self._stats_lock:
+            return dict(self.extractive_stats)
+
+    def chunk_count(self, prepared):
+        return len(prepared[1])
+
+    def summarize(self, prepared_list):
+        return summarize_prepared(self.summarizer, self.tokenizer, prepared_list, self.batch_size)
+
+    def report(self):
+        return report_extractive(self.stats_snapshot())
@@ -0,0 +1,297 @@
+# pip install pymongo
+#
+# Layanan HTTP/JSON lokal untuk membaca koleksi *_prices.
+# Satu MongoClient (connection pool) dipakai bersama oleh semua request,
+# dan hasil query disimpan di LRU cache dengan key (ticker, timeframe, range).
+# Cache otomatis dikosongkan ketika penanda last-write dari pipeline
+# (stock_to_spark.py atau stream_intraday.py) berubah.
+#
+# Contoh:
+#   python price_service.py
+#   curl "http://127.0.0.1:8765/prices?ticker=AALI.JK&timeframe=daily&start=2024-01-01&columns=date,close&max_points=200"
+#   curl "http://127.0.0.1:8765/metrics"   (format Prometheus)
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from mongo_access import MONGO_URI, find_batched, get_client
+from pipeline_metrics import get_metrics
+
+# --- Konfigurasi ---
+DB_NAME = "stock_data"
+META_COLLECTION = "pipeline_meta"
+LAST_WRITE_ID = "prices_last_write"
+# Penanda terpisah dari stream_intraday.py, agar fingerprint tahap yf_resample di orchestrator tidak ikut berubah
+INTRADAY_WRITE_ID = "intraday_last_write"
+HOST = os.environ.get("PRICE_SERVICE_HOST", "127.0.0.1")
+PORT = int(os.environ.get("PRICE_SERVICE_PORT", "8765"))
+CACHE_SIZE = int(os.environ.get("PRICE_SERVICE_CACHE_SIZE", "256"))
+MARKER_CHECK_SECONDS = float(os.environ.get("PRICE_SERVICE_MARKER_CHECK", "5"))
+
+TIMEFRAMES = {
+    "daily": "daily_prices",
+    "weekly": "weekly_prices",
+    "monthly": "monthly_prices",
+    "yearly": "yearly_prices",
+    # Trailing window per tanggal dari rolling_windows.py
+    "trailing_1y": "trailing_1y_prices",
+    "trailing_3y": "trailing_3y_prices",
+    "trailing_5y": "trailing_5y_prices",
+    # Bar intraday dari stream_intraday.py
+    "5m": "5m_prices",
+    "15m": "15m_prices",
+    "1h": "1h_prices",
+    "intraday": "intraday_daily_prices",
+}
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "adj_close", "volume", "complete",
+                 "window_start", "return", "volatility", "max_drawdown"]
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache based on OrderedDict
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class PriceStore:
+    """
+    Read access to the *_prices collections with a cache that is invalidated
+    by the pipeline's last-write marker
+    """
+
+    def __init__(self, client, cache_size=CACHE_SIZE, metrics=None):
+        self.db = client[DB_NAME]
+        self.cache = LRUCache(cache_size)
+        self.metrics = metrics
+        self._marker = None
+        self._marker_checked_at = 0.0
+        self._marker_lock = threading.Lock()
+
+    def _check_marker(self):
+        # Penanda hanya dicek setiap MARKER_CHECK_SECONDS agar tidak menambah query per request
+        now = time.monotonic()
+        with self._marker_lock:
+            if now - self._marker_checked_at < MARKER_CHECK_SECONDS:
+                return
+            self._marker_checked_at = now
+            docs = self.db[META_COLLECTION].find({"_id": {"$in": [LAST_WRITE_ID, INTRADAY_WRITE_ID]}},
+                                                 {"updated_at": 1})
+            markers = {doc["_id"]: doc.get("updated_at") for doc in docs}
+            marker = (markers.get(LAST_WRITE_ID), markers.get(INTRADAY_WRITE_ID))
+            if not any(marker):
+                marker = None
+            if marker != self._marker:
+                if self._marker is not None:
+                    print(f"♻️ Penanda last-write berubah ({marker}), cache dikosongkan")
+                self.cache.clear()
+                self._marker = marker
+
+    def _load(self, ticker, timeframe, start, end, tail):
+        query = {"ticker": ticker}
+        date_filter = {}
+        if start:
+            date_filter["$gte"] = start
+        if end:
+            date_filter["$lte"] = end
+        if date_filter:
+            query["date"] = date_filter
+
+        projection = {c: 1 for c in PRICE_COLUMNS}
+        projection["_id"] = 0
+        collection = self.db[TIMEFRAMES[timeframe]]
+        if tail:
+            rows = list(find_batched(collection, query, projection, sort=[("date", -1)], limit=tail))
+            rows.reverse()
+        else:
+            rows = list(find_batched(collection, query, projection, sort=[("date", 1)]))
+        return rows
+
+    def query(self, ticker, timeframe, start=None, end=None, tail=None, columns=None, max_points=None):
+        if timeframe not in TIMEFRAMES:
+            raise ValueError(f"Timeframe tidak dikenal: {timeframe}")
+        self._check_marker()
+
+        key = (ticker, timeframe, start, end, tail)
+        rows = self.cache.get(key)
+        if rows is None:
+            start_load = time.perf_counter()
+            rows = self._load(ticker, timeframe, start, end, tail)
+            self.cache.put(key, rows)
+            if self.metrics is not None:
+                self.metrics.count("cache_requests_total", result="miss", timeframe=timeframe)
+                self.metrics.observe("mongo_load_seconds", time.perf_counter() - start_load, timeframe=timeframe)
+        elif self.metrics is not None:
+            self.metrics.count("cache_requests_total", result="hit", timeframe=timeframe)
+
+        if max_points and len(rows) > max_points:
+            rows = downsample_ohlc(rows, max_points)
+        if columns:
+            rows = [{c: r.get(c) for c in columns} for r in rows]
+        return rows
+
+
+def downsample_ohlc(rows, max_points):
+    """
+    Reduce rows to at most max_points OHLC buckets (first open, max high,
+    min low, last close, summed volume)
+    """
+    size = -(-len(rows) // max_points)
+    result = []
+    for i in range(0, len(rows), size):
+        bucket = rows[i:i + size]
+        highs = [r["high"] for r in bucket if r.get("high") is not None]
+        lows = [r["low"] for r in bucket if r.get("low") is not None]
+        volumes = [r["volume"] for r in bucket if r.get("volume") is not None]
+        merged = dict(bucket[-1])
+        merged["date"] = bucket[0].get("date")
+        merged["open"] = bucket[0].get("open")
+        merged["high"] = max(highs) if highs else None
+        merged["low"] = min(lows) if lows else None
+        merged["volume"] = sum(volumes) if volumes else None
+        result.append(merged)
+    return result
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class PriceRequestHandler(BaseHTTPRequestHandler):
+    store = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=_json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+            return
+        if url.path == "/cache":
+            self._send_json(200, self.store.cache.stats())
+            return
+        if url.path == "/metrics" and self.store.metrics is not None:
+            body = self.store.metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if url.path != "/prices":
+            self._send_json(404, {"error": "Endpoint tidak ditemukan"})
+            return
+
+        request_start = time.perf_counter()
+        try:
+            ticker = params["ticker"]
+            timeframe = params.get("timeframe", "daily")
+            columns = params["columns"].split(",") if params.get("columns") else None
+            rows = self.store.query(
+                ticker,
+                timeframe,
+                start=_parse_date(params.get("start")),
+                end=_parse_date(params.get("end")),
+                tail=int(params["tail"]) if params.get("tail") else None,
+                columns=columns,
+                max_points=int(params["max_points"]) if params.get("max_points") else None,
+            )
+        except KeyError:
+            self._send_json(400, {"error": "Parameter 'ticker' wajib diisi"})
+            return
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(200, {"ticker": ticker, "timeframe": timeframe, "count": len(rows), "data": rows})
+        if self.store.metrics is not None:
+            self.store.metrics.observe("request_seconds", time.perf_counter() - request_start, timeframe=timeframe)
+            self.store.metrics.count("rows_served_total", len(rows), timeframe=timeframe)
+
+    def log_message(self, format, *args):
+        # Log bawaan http.server terlalu ramai untuk pemakaian chart
+        pass
+
+
+def main():
+    print("🔌 Menghubungkan ke MongoDB...")
+    client = get_client(MONGO_URI, serverSelectionTimeoutMS=5000)
+    client.server_info()
+    print("✅ Koneksi MongoDB berhasil")
+
+    PriceRequestHandler.store = PriceStore(client, metrics=get_metrics("price_service"))
+    server = ThreadingHTTPServer((HOST, PORT), PriceRequestHandler)
+    print(f"🚀 Price service berjalan di http://{HOST}:{PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Price service dihentikan")
+    finally:
+        server.server_close()
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
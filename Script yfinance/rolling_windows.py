@@ -0,0 +1,196 @@
+# Statistik trailing window 1 / 3 / 5 tahun dari data harian.
+#
+# Untuk setiap tanggal D, jendela berisi semua bar harian dengan tanggal > D - N tahun.
+# Per jendela dihitung OHLCV (open bar pertama, high/low ekstrem, close D, total volume),
+# return total, volatilitas tahunan (std log return harian x sqrt(252)), dan max drawdown.
+#
+# Perhitungan satu kali jalan O(n) per ticker: jendela digeser dengan sliding-window
+# aggregator dua stack, sehingga setiap bar hanya ditambahkan dan dikeluarkan sekali
+# (tidak ada scan ulang bertahun-tahun bar untuk setiap tanggal). Max drawdown ikut
+# digabung secara inkremental karena ringkasan (peak, trough, drawdown) sebuah segmen
+# bisa digabung secara asosiatif.
+#
+# Hasil disimpan per (ticker, date) ke koleksi trailing_1y_prices, trailing_3y_prices,
+# trailing_5y_prices, sehingga statistik jangka panjang bisa di-query untuk tanggal mana
+# saja. Semua harga memakai satu seri yang disesuaikan (Adj Close jika ada; OHLC ikut
+# diskalakan dengan faktor Adj Close / Close). Baris yang sudah final (jendela penuh) tidak
+# ditulis ulang pada run berikutnya, kecuali seri harga tersimpan berbeda dari seri baru
+# (mis. penyesuaian dividen/split mengubah seluruh history): ticker dihitung ulang penuh.
+#
+# Contoh:
+#   from rolling_windows import materialize_trailing_windows
+#   materialize_trailing_windows(db, pd_df, "BBRI.JK")
+
+import math
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from mongo_access import BulkWriter
+
+HORIZONS = {"trailing_1y": 1, "trailing_3y": 3, "trailing_5y": 5}
+TRADING_DAYS = 252
+
+# Ringkasan segmen: (high, low, volume, sum_r, sum_r2, n_r, peak, trough, max_drawdown)
+_HIGH, _LOW, _VOLUME, _SUM_R, _SUM_R2, _N_R, _PEAK, _TROUGH, _MDD = range(9)
+
+
+def _leaf(high, low, close, volume, log_return):
+    if log_return is None:
+        return (high, low, volume, 0.0, 0.0, 0, close, close, 0.0)
+    return (high, low, volume, log_return, log_return * log_return, 1, close, close, 0.0)
+
+
+# Fungsi menggabungkan segmen lama (a) dengan segmen yang lebih baru (b)
+def _combine(a, b):
+    drop = b[_TROUGH] / a[_PEAK] - 1 if a[_PEAK] > 0 else 0.0
+    return (
+        max(a[_HIGH], b[_HIGH]),
+        min(a[_LOW], b[_LOW]),
+        a[_VOLUME] + b[_VOLUME],
+        a[_SUM_R] + b[_SUM_R],
+        a[_SUM_R2] + b[_SUM_R2],
+        a[_N_R] + b[_N_R],
+        max(a[_PEAK], b[_PEAK]),
+        min(a[_TROUGH], b[_TROUGH]),
+        min(a[_MDD], b[_MDD], drop),
+    )
+
+
+class SlidingAggregator:
+    """
+    FIFO window with O(1) amortized push/pop/query for an associative combine function
+    """
+
+    def __init__(self, combine):
+        self.combine = combine
+        # front: elemen tertua di atas, masing-masing menyimpan agregat dirinya + yang lebih baru di front
+        self.front = []
+        # back: elemen terbaru, dengan satu agregat berjalan
+        self.back = []
+        self.back_agg = None
+
+    def __len__(self):
+        return len(self.front) + len(self.back)
+
+    def push(self, value):
+        self.back.append(value)
+        self.back_agg = value if self.back_agg is None else self.combine(self.back_agg, value)
+
+    def pop(self):
+        if not self.front:
+            agg = None
+            while self.back:
+                value = self.back.pop()
+                agg = value if agg is None else self.combine(value, agg)
+                self.front.append(agg)
+            self.back_agg = None
+        self.front.pop()
+
+    def query(self):
+        if not self.front:
+            return self.back_agg
+        if self.back_agg is None:
+            return self.front[-1]
+        return self.combine(self.front[-1], self.back_agg)
+
+
+def trailing_window_stats(pd_df, years):
+    """
+    Return one dict per daily bar with trailing-window OHLCV, return, volatility and max drawdown
+    """
+    price_column = "Adj Close" if "Adj Close" in pd_df.columns else "Close"
+    # Bar tanpa harga (NaN dari yfinance) dilewati; NaN juga membuat perbandingan close
+    # di materialize_trailing_windows selalu dianggap berubah
+    df = pd_df.dropna(subset=[price_column]).sort_values("Date").reset_index(drop=True)
+    dates = pd.to_datetime(df["Date"])
+    bounds = (dates - pd.DateOffset(years=years)).dt.to_pydatetime().tolist()
+    dates = dates.dt.to_pydatetime().tolist()
+    # Faktor penyesuaian per bar; yfinance dengan auto_adjust sudah memberi Close yang disesuaikan
+    if "Adj Close" in df.columns:
+        factor = (df["Adj Close"] / df["Close"]).where(df["Close"] > 0, 1.0).fillna(1.0)
+    else:
+        factor = 1.0
+    opens = (df["Open"] * factor).tolist()
+    highs = (df["High"] * factor).tolist()
+    lows = (df["Low"] * factor).tolist()
+    prices = df[price_column].tolist()
+    volumes = df["Volume"].fillna(0).tolist()
+
+    window = SlidingAggregator(_combine)
+    rows = []
+    start = 0
+    for i in range(len(df)):
+        prev = prices[i - 1] if i > 0 else None
+        log_return = math.log(prices[i] / prev) if prev and prices[i] and prev > 0 and prices[i] > 0 else None
+        window.push(_leaf(highs[i], lows[i], prices[i], volumes[i], log_return))
+        while dates[start] <= bounds[i]:
+            window.pop()
+            start += 1
+
+        agg = window.query()
+        n = agg[_N_R]
+        volatility = None
+        if n > 1:
+            variance = max((agg[_SUM_R2] - agg[_SUM_R] * agg[_SUM_R] / n) / (n - 1), 0.0)
+            volatility = math.sqrt(variance) * math.sqrt(TRADING_DAYS)
+        rows.append({
+            "date": dates[i],
+            "window_start": dates[start],
+            "open": opens[start],
+            "high": agg[_HIGH],
+            "low": agg[_LOW],
+            "close": prices[i],
+            "volume": agg[_VOLUME],
+            "return": math.exp(agg[_SUM_R]) - 1 if n else None,
+            "volatility": volatility,
+            "max_drawdown": agg[_MDD],
+            "bars": i - start + 1,
+            # Jendela penuh jika ada bar sebelum batas awal jendela
+            "complete": start > 0,
+        })
+    return rows
+
+
+def materialize_trailing_windows(db, pd_df, ticker, horizons=HORIZONS, full=False):
+    """
+    Upsert trailing-window rows per (ticker, date); complete rows are skipped while the stored
+    adjusted closes still match the new series
+    """
+    counts = {}
+    now = datetime.now()
+    for name, years in horizons.items():
+        collection = db[f"{name}_prices"]
+        collection.create_index([("ticker", 1), ("date", 1)], unique=True)
+
+        rows = trailing_window_stats(pd_df, years)
+        skip_dates = set()
+        if not full:
+            stored = {doc["date"]: doc for doc in collection.find(
+                {"ticker": ticker}, {"_id": 0, "date": 1, "close": 1, "complete": 1})}
+            # Setiap bar punya barisnya sendiri, jadi membandingkan close tersimpan dengan seri
+            # baru mencakup semua bar di semua jendela
+            changed = any(
+                row["date"] in stored and not math.isclose(stored[row["date"]].get("close") or 0.0,
+                                                            row["close"] or 0.0, rel_tol=1e-9)
+                for row in rows
+            )
+            if changed:
+                print(f"♻️ Seri harga {ticker} berubah (penyesuaian dividen/split), {name} dihitung ulang penuh")
+            else:
+                skip_dates = {date for date, doc in stored.items() if doc.get("complete")}
+                # Bar terakhir selalu ditulis ulang
+                if stored:
+                    skip_dates.discard(max(stored))
+
+        with BulkWriter(collection) as writer:
+            for row in rows:
+                if row["date"] in skip_dates:
+                    continue
+                row.update({"ticker": ticker, "timeframe": name, "inserted_at": now})
+                writer.upsert({"ticker": ticker, "date": row["date"]}, row)
+        counts[name] = writer.written()
+    return counts
@@ -4,36 +4,58 @@ import time
 from datetime import datetime
 import math
 from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, lit, first, max as spark_max, min as spark_min, last, sum as spark_sum
+from pyspark.sql.functions import col, concat_ws, date_format, lit, first, max as spark_max, min as spark_min, last, sum as spark_sum
 import os
+import sys
 
-# --- Initialize Spark Session ---
-print("Initializing Apache Spark...")
-spark = SparkSession.builder \
-    .appName("StockDataProcessor") \
-    .config("spark.mongodb.output.uri", "mongodb://localhost:27017/stock_data") \
-    .config("spark.jars.packages", "org.mongodb.spark:mongo-spark-connector_2.12:3.0.2") \
-    .getOrCreate()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from pipeline_metrics import get_metrics
+from mongo_access import SPARK_WRITE_OPTIONS, database_uri, get_client
+import spark_session
+from rolling_windows import HORIZONS, materialize_trailing_windows
 
-print("✅ Spark session established")
+# Panjang history yang diunduh; trailing_5y hanya lengkap jika history lebih dari 5 tahun
+HISTORY_PERIOD = os.environ.get("YF_HISTORY_PERIOD", "10y")
 
-# --- Load ticker dari Excel ---
-print("📋 Loading tickers from Excel...")
-try:
-    # Use pandas to read Excel and convert to Spark DataFrame
-    tickers_df = pd.read_excel("tickers.xlsx")
-    tickers = [t + ".JK" for t in tickers_df["Ticker"].tolist()]
-    print(f"✅ Loaded {len(tickers)} tickers")
-except Exception as e:
-    print(f"❌ Error loading tickers: {e}")
-    # Fallback to a small list for testing
-    tickers = ["BBRI.JK", "BBCA.JK", "TLKM.JK", "ASII.JK", "BMRI.JK"]
-    print(f"🔄 Using fallback list of {len(tickers)} tickers")
+def create_spark_session():
+    """
+    Initialize the Spark session with the MongoDB connector
+    """
+    print("Initializing Apache Spark...")
+    # Profil diatur lewat SPARK_PROFILE (default local-small, cocok untuk data per ticker)
+    spark = spark_session.create_spark_session(
+        "StockDataProcessor",
+        # Server yang sama dengan client penanda last-write (MONGO_URI)
+        mongo_output_uri=database_uri("stock_data")
+    )
+
+    print("✅ Spark session established")
+    return spark
+
+def load_tickers(path="tickers.xlsx"):
+    """
+    Load ticker list from Excel, falling back to a small list for testing
+    """
+    print("📋 Loading tickers from Excel...")
+    try:
+        # Use pandas to read Excel and convert to Spark DataFrame
+        tickers_df = pd.read_excel(path)
+        tickers = [t + ".JK" for t in tickers_df["Ticker"].tolist()]
+        print(f"✅ Loaded {len(tickers)} tickers")
+    except Exception as e:
+        print(f"❌ Error loading tickers: {e}")
+        # Fallback to a small list for testing
+        tickers = ["BBRI.JK", "BBCA.JK", "TLKM.JK", "ASII.JK", "BMRI.JK"]
+        print(f"🔄 Using fallback list of {len(tickers)} tickers")
+    return tickers
 
 def resample_data_spark(spark_df, ticker, timeframe):
     """
-    Resample data to different timeframes using Spark SQL
+    Resample data to different timeframes using Spark SQL.
+    Multi-year statistics are trailing windows, see rolling_windows.py
     """
+    spark = SparkSession.getActiveSession()
+
     # Register the DataFrame as a temporary view
     spark_df.createOrReplaceTempView("stock_data")
     
@@ -100,82 +122,6 @@ def resample_data_spark(spark_df, ticker, timeframe):
         """
         return spark.sql(yearly_query)
     
-    elif timeframe in ["3year", "5year"]:
-        # First generate yearly data
-        yearly_query = f"""
-        SELECT 
-            date_trunc('year', Date) as Date,
-            year(Date) as year_num,
-            first(Open) as Open,
-            max(High) as High,
-            min(Low) as Low,
-            last(Close) as Close{adj_close_clause},
-            sum(Volume) as Volume,
-            first(Ticker) as Ticker
-        FROM stock_data
-        GROUP BY date_trunc('year', Date), year(Date)
-        ORDER BY Date
-        """
-        
-        # Create temporary view of yearly data
-        spark.sql(yearly_query).createOrReplaceTempView("yearly_data")
-        
-        # Get minimum year for grouping reference
-        min_year_row = spark.sql("SELECT MIN(year_num) as min_year FROM yearly_data").collect()
-        min_year = min_year_row[0]['min_year']
-        
-        # Group size based on timeframe
-        group_size = 3 if timeframe == "3year" else 5
-        
-        # Create the multi-year grouping query
-        multi_year_query = f"""
-        SELECT 
-            FLOOR((year_num - {min_year}) / {group_size}) as group_id,
-            MIN(year_num) as start_year,
-            MAX(year_num) as end_year,
-            FIRST(Open) as Open,
-            MAX(High) as High,
-            MIN(Low) as Low,
-            LAST(Close) as Close,
-            SUM(Volume) as Volume,
-            FIRST(Ticker) as Ticker,
-            MAX(Date) as Date
-            {', LAST(Adj Close) as Adj Close' if has_adj_close else ''}
-        FROM yearly_data
-        GROUP BY FLOOR((year_num - {min_year}) / {group_size})
-        ORDER BY group_id
-        """
-        
-        # Execute multi-year query
-        multi_year_df = spark.sql(multi_year_query)
-        
-        # Format the Date to be the end of the last year in the period
-        # And create a more descriptive period label
-        period_df = multi_year_df.selectExpr(
-            "Date",
-            "Open", 
-            "High",
-            "Low",
-            "Close",
-            f"{'Adj Close,' if has_adj_close else ''}"
-            "Volume",
-            "Ticker",
-            "CONCAT(start_year, '-', end_year) as period"
-        )
-        
-        # Return result without the grouping columns
-        return period_df.select(
-            "Date", 
-            "Open", 
-            "High", 
-            "Low", 
-            "Close", 
-            *(["Adj Close"] if has_adj_close else []),
-            "Volume", 
-            "Ticker",
-            "period"
-        )
-    
     return None
 
 def save_to_mongodb(spark_df, collection_name, ticker, timeframe):
@@ -191,7 +137,10 @@ def save_to_mongodb(spark_df, collection_name, ticker, timeframe):
                                .withColumn("inserted_at", lit(datetime.now()))
     
     # Prepare columns for MongoDB (based on what's available)
+    # _id deterministik per (ticker, date): connector meng-upsert (replace) dokumen dengan _id,
+    # sehingga run berikutnya menimpa bar yang sama alih-alih menambah salinan history
     columns_to_select = [
+        concat_ws(":", col("Ticker"), date_format(col("Date"), "yyyy-MM-dd")).alias("_id"),
         col("Ticker").alias("ticker"),
         col("Date").alias("date"),
         col("timeframe"),
@@ -212,9 +161,11 @@ def save_to_mongodb(spark_df, collection_name, ticker, timeframe):
     # Write to MongoDB
     try:
         # Use the MongoDB Spark connector to write data
+        # Opsi write (unordered, batch size, write concern) sama dengan mongo_access.BulkWriter
         df_to_save.write \
                  .format("mongo") \
                  .option("collection", collection_name) \
+                 .options(**SPARK_WRITE_OPTIONS) \
                  .mode("append") \
                  .save()
         
@@ -225,119 +176,176 @@ def save_to_mongodb(spark_df, collection_name, ticker, timeframe):
         print(f"❌ Failed to save {timeframe} data for {ticker} to MongoDB: {e}")
         return 0
 
-# --- Konfigurasi parallelism ---
-BATCH_SIZE = 5  # Jumlah ticker per batch
-total_batches = math.ceil(len(tickers) / BATCH_SIZE)
+def mark_last_write(meta_client, ticker):
+    """
+    Update the last-write marker so readers (price_service.py) drop stale cache entries
+    """
+    try:
+        meta_client["stock_data"]["pipeline_meta"].update_one(
+            {"_id": "prices_last_write"},
+            {"$set": {"updated_at": datetime.now(), "ticker": ticker}},
+            upsert=True
+        )
+    except Exception as e:
+        print(f"⚠ Failed to update last-write marker: {e}")
+
+def main():
+    metrics = get_metrics("stock_to_spark")
+    with metrics.timer("spark_startup"):
+        spark = create_spark_session()
+
+    # Koneksi pymongo untuk penanda last-write (dibaca oleh price_service.py)
+    meta_client = get_client(serverSelectionTimeoutMS=5000)
+
+    # --- Load ticker dari Excel ---
+    tickers = load_tickers()
 
-# Counter untuk tracking
-timeframes = ["daily", "weekly", "monthly", "yearly", "3year", "5year"]
-total_documents = {timeframe: 0 for timeframe in timeframes}
-successful_tickers = 0
+    # --- Konfigurasi parallelism ---
+    BATCH_SIZE = 5  # Jumlah ticker per batch
+    total_batches = math.ceil(len(tickers) / BATCH_SIZE)
 
-# --- Proses ticker per batch ---
-for batch_idx in range(total_batches):
-    start_idx = batch_idx * BATCH_SIZE
-    end_idx = min((batch_idx + 1) * BATCH_SIZE, len(tickers))
-    batch_tickers = tickers[start_idx:end_idx]
+    # Counter untuk tracking
+    timeframes = ["daily", "weekly", "monthly", "yearly"]
+    total_documents = {timeframe: 0 for timeframe in timeframes + list(HORIZONS)}
+    successful_tickers = 0
+
+    # --- Proses ticker per batch ---
+    for batch_idx in range(total_batches):
+        start_idx = batch_idx * BATCH_SIZE
+        end_idx = min((batch_idx + 1) * BATCH_SIZE, len(tickers))
+        batch_tickers = tickers[start_idx:end_idx]
     
-    print(f"\n🔄 Processing Batch {batch_idx + 1}/{total_batches} ({start_idx + 1}-{end_idx} of {len(tickers)} tickers)")
+        print(f"\n🔄 Processing Batch {batch_idx + 1}/{total_batches} ({start_idx + 1}-{end_idx} of {len(tickers)} tickers)")
     
-    for ticker in batch_tickers:
-        ticker_success = False
-        print(f"\n📥 Fetching data: {ticker}")
+        for ticker in batch_tickers:
+            ticker_success = False
+            ticker_start = time.perf_counter()
+            print(f"\n📥 Fetching data: {ticker}")
         
-        for attempt in range(3):  # Coba maksimum 3 kali
-            try:
-                # Download data using yfinance
-                pd_df = yf.download(ticker, period="5y")
-                if pd_df.empty:
-                    print(f"⚠ Empty data for {ticker}, possibly not available on Yahoo Finance.")
-                    break
+            for attempt in range(3):  # Coba maksimum 3 kali
+                try:
+                    # Download data using yfinance
+                    with metrics.timer("download", ticker=ticker):
+                        pd_df = yf.download(ticker, period=HISTORY_PERIOD)
+                    if pd_df.empty:
+                        print(f"⚠ Empty data for {ticker}, possibly not available on Yahoo Finance.")
+                        metrics.count("tickers_total", status="empty")
+                        break
                 
-                # Show column names for debugging
-                print(f"🔍 Original columns: {pd_df.columns}")
+                    # Show column names for debugging
+                    print(f"🔍 Original columns: {pd_df.columns}")
                 
-                # Handle multiindex columns if they exist
-                if isinstance(pd_df.columns, pd.MultiIndex):
-                    print("🔄 Flattening MultiIndex columns")
-                    # Convert multiindex columns to flat columns
-                    pd_df.columns = [' '.join(col).strip() for col in pd_df.columns.values]
+                    # Handle multiindex columns if they exist
+                    if isinstance(pd_df.columns, pd.MultiIndex):
+                        print("🔄 Flattening MultiIndex columns")
+                        # Convert multiindex columns to flat columns
+                        pd_df.columns = [' '.join(col).strip() for col in pd_df.columns.values]
                 
-                # Reset index to make Date a column
-                pd_df = pd_df.reset_index()
+                    # Reset index to make Date a column
+                    pd_df = pd_df.reset_index()
                 
-                # Rename columns to standard names
-                column_mapping = {
-                    'Open AALI.JK': 'Open',
-                    'High AALI.JK': 'High',
-                    'Low AALI.JK': 'Low',
-                    'Close AALI.JK': 'Close',
-                    'Volume AALI.JK': 'Volume',
-                    'Adj Close AALI.JK': 'Adj Close'
-                }
+                    # Rename columns to standard names
+                    column_mapping = {
+                        'Open AALI.JK': 'Open',
+                        'High AALI.JK': 'High',
+                        'Low AALI.JK': 'Low',
+                        'Close AALI.JK': 'Close',
+                        'Volume AALI.JK': 'Volume',
+                        'Adj Close AALI.JK': 'Adj Close'
+                    }
                 
-                # Dynamically replace ticker name in columns
-                actual_mapping = {}
-                for old_name in pd_df.columns:
-                    if ticker in old_name:
-                        new_name = old_name.replace(f' {ticker}', '')
-                        actual_mapping[old_name] = new_name
+                    # Dynamically replace ticker name in columns
+                    actual_mapping = {}
+                    for old_name in pd_df.columns:
+                        if ticker in old_name:
+                            new_name = old_name.replace(f' {ticker}', '')
+                            actual_mapping[old_name] = new_name
                 
-                # Rename columns if they match our pattern
-                pd_df = pd_df.rename(columns=actual_mapping)
+                    # Rename columns if they match our pattern
+                    pd_df = pd_df.rename(columns=actual_mapping)
                 
-                # Add ticker column
-                pd_df["Ticker"] = ticker
+                    # Add ticker column
+                    pd_df["Ticker"] = ticker
                 
-                # Print final columns
-                print(f"🔍 Final columns: {pd_df.columns.tolist()}")
+                    # Print final columns
+                    print(f"🔍 Final columns: {pd_df.columns.tolist()}")
                 
-                # Create Spark DataFrame (let Spark infer schema)
-                spark_df = spark.createDataFrame(pd_df)
+                    # Create Spark DataFrame (let Spark infer schema)
+                    with metrics.timer("to_spark", ticker=ticker):
+                        spark_df = spark.createDataFrame(pd_df)
                 
-                # Debug information
-                print(f"📊 Found {spark_df.count()} days of data for {ticker}")
+                    # Debug information
+                    print(f"📊 Found {len(pd_df)} days of data for {ticker}")
                 
-                # Process data for each timeframe
-                print("🔄 Resampling data to different timeframes using Spark...")
-                ticker_docs_counts = {}
+                    # Process data for each timeframe
+                    print("🔄 Resampling data to different timeframes using Spark...")
+                    ticker_docs_counts = {}
                 
-                for timeframe in timeframes:
-                    # Resample to the specific timeframe
-                    resampled_df = resample_data_spark(spark_df, ticker, timeframe)
+                    for timeframe in timeframes:
+                        # Resample to the specific timeframe
+                        with metrics.timer("resample", ticker=ticker, timeframe=timeframe):
+                            resampled_df = resample_data_spark(spark_df, ticker, timeframe)
                     
-                    # Save to MongoDB
-                    collection_name = f"{timeframe}_prices"
-                    count = save_to_mongodb(resampled_df, collection_name, ticker, timeframe)
-                    ticker_docs_counts[timeframe] = count
-                    total_documents[timeframe] += count
+                        # Save to MongoDB (Spark lazy, jadi eksekusi resample ikut terhitung di sini)
+                        collection_name = f"{timeframe}_prices"
+                        with metrics.timer("mongo_write", ticker=ticker, timeframe=timeframe):
+                            count = save_to_mongodb(resampled_df, collection_name, ticker, timeframe)
+                        metrics.count("documents_written_total", count, timeframe=timeframe)
+                        ticker_docs_counts[timeframe] = count
+                        total_documents[timeframe] += count
+
+                    # Trailing window 1/3/5 tahun dihitung inkremental dari seri harian (pandas)
+                    with metrics.timer("trailing_windows", ticker=ticker):
+                        trailing_counts = materialize_trailing_windows(meta_client["stock_data"], pd_df, ticker)
+                    for name, count in trailing_counts.items():
+                        metrics.count("documents_written_total", count, timeframe=name)
+                        ticker_docs_counts[name] = count
+                        total_documents[name] += count
                 
-                # Check if we successfully inserted any data
-                if sum(ticker_docs_counts.values()) > 0:
-                    ticker_success = True
-                    successful_tickers += 1
-                    print(f"✅ Successfully processed {ticker} data for all timeframes")
-                    for tf, count in ticker_docs_counts.items():
-                        if count > 0:
-                            print(f"   - {tf.capitalize()}: {count} records")
-                else:
-                    print(f"⚠ No data was saved for {ticker}")
+                    # Check if we successfully inserted any data
+                    if sum(ticker_docs_counts.values()) > 0:
+                        ticker_success = True
+                        successful_tickers += 1
+                        mark_last_write(meta_client, ticker)
+                        metrics.count("tickers_total", status="ok")
+                        print(f"✅ Successfully processed {ticker} data for all timeframes")
+                        for tf, count in ticker_docs_counts.items():
+                            if count > 0:
+                                print(f"   - {tf.capitalize()}: {count} records")
+                    else:
+                        print(f"⚠ No data was saved for {ticker}")
+                        metrics.count("tickers_total", status="no_data")
                 
-                break  # Exit retry loop
+                    break  # Exit retry loop
                 
-            except Exception as e:
-                print(f"❌ Failed to process {ticker} (attempt {attempt+1}): {e}")
-                if attempt < 2:  # Only sleep if we're going to retry
-                    time.sleep(2)  # Wait 2 seconds before retrying
+                except Exception as e:
+                    print(f"❌ Failed to process {ticker} (attempt {attempt+1}): {e}")
+                    metrics.count("ticker_errors_total")
+                    if attempt < 2:  # Only sleep if we're going to retry
+                        time.sleep(2)  # Wait 2 seconds before retrying
+                    else:
+                        metrics.count("tickers_total", status="failed")
+
+            metrics.event("ticker_done", ticker=ticker, success=ticker_success,
+                          seconds=round(time.perf_counter() - ticker_start, 3))
     
-    print(f"\n📈 Batch {batch_idx + 1} summary: Processed {len(batch_tickers)} tickers")
+        print(f"\n📈 Batch {batch_idx + 1} summary: Processed {len(batch_tickers)} tickers")
+        metrics.record_spark_stages(spark)
+        metrics.flush()
+
+    # --- Final summary ---
+    print("\n====== OPERATION COMPLETE ======")
+    print(f"📊 Total tickers processed: {successful_tickers}/{len(tickers)}")
+    for timeframe in total_documents:
+        print(f"📊 {timeframe.capitalize()} records saved to MongoDB: {total_documents[timeframe]}")
+
+    metrics.print_summary()
+    metrics.flush()
 
-# --- Final summary ---
-print("\n====== OPERATION COMPLETE ======")
-print(f"📊 Total tickers processed: {successful_tickers}/{len(tickers)}")
-for timeframe in timeframes:
-    print(f"📊 {timeframe.capitalize()} records saved to MongoDB: {total_documents[timeframe]}")
+    # Stop Spark session
+    meta_client.close()
+    spark.stop()
+    print("\n✨ Program finished! ✨")
 
-# Stop Spark session
-spark.stop()
-print("\n✨ Program finished! ✨")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
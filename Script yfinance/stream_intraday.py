@@ -0,0 +1,243 @@
+# pip install pyspark pymongo
+#
+# Job Spark Structured Streaming untuk bar intraday sesi IDX.
+#
+# Membaca tick (ticker, ts, price, volume) atau bar menit (ticker, ts, open, high, low,
+# close, volume) dari folder CSV yang terus bertambah atau dari socket, lalu menjaga
+# agregat OHLCV bergulir 5m / 15m / 1h / harian dengan watermark. Setiap micro-batch
+# meng-upsert bucket yang berubah (baik yang sudah selesai maupun yang masih berjalan)
+# ke price store:
+#   5m_prices, 15m_prices, 1h_prices, intraday_daily_prices
+# dengan key (ticker, date). Field "complete" menandai bucket yang sudah melewati watermark;
+# setelah setiap batch, bucket lama yang end-nya sudah di belakang watermark ditandai final.
+# Penanda intraday_last_write diperbarui setiap batch sehingga cache price_service.py ikut segar.
+#
+# Sumber socket hanya mendukung satu timeframe per proses: setiap streaming query membuka
+# koneksi socket sendiri, sehingga beberapa timeframe akan membagi baris di antara koneksi.
+#
+# Contoh:
+#   python stream_intraday.py --source file --path incoming_ticks/ --input-kind ticks
+#   python stream_intraday.py --source socket --port 9999 --input-kind bars --timeframes 5m
+#   (format baris socket: "BBRI.JK,2025-01-02 09:01:00,4850,12000" untuk ticks)
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from pyspark.sql.functions import col, expr, lit, split, sum as spark_sum, to_timestamp, window
+from pyspark.sql.functions import max as spark_max, min as spark_min, count as spark_count
+from pyspark.sql.types import DoubleType, StringType, StructField, StructType, TimestampType
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Script Common"))
+from mongo_access import BulkWriter, get_db
+from pipeline_metrics import get_metrics
+from spark_session import create_spark_session
+
+# --- Konfigurasi ---
+DB_NAME = "stock_data"
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTRADAY_WRITE_ID = "intraday_last_write"
+WATERMARK = os.environ.get("INTRADAY_WATERMARK", "10 minutes")
+# Timestamp diasumsikan sudah dalam WIB, sehingga jendela harian dimulai 00:00 WIB.
+# Jika timestamp dalam UTC, set INTRADAY_DAILY_OFFSET="17 hours" (00:00 WIB = 17:00 UTC)
+DAILY_START_OFFSET = os.environ.get("INTRADAY_DAILY_OFFSET", "0 hours")
+
+TIMEFRAMES = {
+    "5m": {"duration": "5 minutes", "collection": "5m_prices"},
+    "15m": {"duration": "15 minutes", "collection": "15m_prices"},
+    "1h": {"duration": "1 hour", "collection": "1h_prices"},
+    "daily": {"duration": "1 day", "collection": "intraday_daily_prices", "start": DAILY_START_OFFSET},
+}
+
+TICK_SCHEMA = StructType([
+    StructField("ticker", StringType(), True),
+    StructField("ts", TimestampType(), True),
+    StructField("price", DoubleType(), True),
+    StructField("volume", DoubleType(), True),
+])
+
+BAR_SCHEMA = StructType([
+    StructField("ticker", StringType(), True),
+    StructField("ts", TimestampType(), True),
+    StructField("open", DoubleType(), True),
+    StructField("high", DoubleType(), True),
+    StructField("low", DoubleType(), True),
+    StructField("close", DoubleType(), True),
+    StructField("volume", DoubleType(), True),
+])
+
+
+def _parse_duration(text):
+    value, unit = text.split()
+    seconds = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}[unit.rstrip("s")]
+    return timedelta(seconds=int(value) * seconds)
+
+
+def read_source(spark, args):
+    """
+    Build the streaming input as bars with columns ticker, ts, open, high, low, close, volume
+    """
+    schema = TICK_SCHEMA if args.input_kind == "ticks" else BAR_SCHEMA
+    if args.source == "file":
+        raw = spark.readStream \
+            .schema(schema) \
+            .option("header", "true") \
+            .option("maxFilesPerTrigger", args.max_files_per_trigger) \
+            .csv(args.path)
+    else:
+        lines = spark.readStream.format("socket").option("host", args.host).option("port", args.port).load()
+        parts = split(col("value"), ",")
+        columns = [field.name for field in schema.fields]
+        raw = lines.select(*[
+            (to_timestamp(parts.getItem(idx)) if field.dataType == TimestampType()
+             else parts.getItem(idx).cast(field.dataType)).alias(field.name)
+            for idx, field in enumerate(schema.fields)
+        ]).select(*columns)
+
+    if args.input_kind == "ticks":
+        raw = raw.select(
+            "ticker", "ts",
+            col("price").alias("open"), col("price").alias("high"),
+            col("price").alias("low"), col("price").alias("close"),
+            "volume",
+        )
+    return raw.where(col("ticker").isNotNull() & col("ts").isNotNull())
+
+
+def aggregate_bars(bars, timeframe):
+    """
+    Tumbling OHLCV buckets for one timeframe; late rows beyond the watermark are dropped
+    """
+    config = TIMEFRAMES[timeframe]
+    bucket = window("ts", config["duration"], config["duration"], config.get("start", "0 seconds"))
+    # open/close diambil dari bar dengan timestamp paling awal/akhir di bucket
+    return bars \
+        .withWatermark("ts", WATERMARK) \
+        .groupBy(bucket.alias("bucket"), "ticker") \
+        .agg(
+            expr("min_by(open, ts)").alias("open"),
+            spark_max("high").alias("high"),
+            spark_min("low").alias("low"),
+            expr("max_by(close, ts)").alias("close"),
+            spark_sum("volume").alias("volume"),
+            spark_count(lit(1)).alias("bar_count"),
+            spark_max("ts").alias("last_ts"),
+        ) \
+        .select(
+            "ticker",
+            col("bucket.start").alias("date"),
+            col("bucket.end").alias("bucket_end"),
+            "open", "high", "low", "close", "volume", "bar_count", "last_ts",
+        )
+
+
+class BucketWriter:
+    """
+    foreachBatch sink that upserts changed buckets and tracks the event-time watermark
+    """
+
+    def __init__(self, timeframe, metrics):
+        self.timeframe = timeframe
+        self.collection = get_db(DB_NAME)[TIMEFRAMES[timeframe]["collection"]]
+        self.collection.create_index([("ticker", 1), ("date", 1)], unique=True)
+        self.collection.create_index([("complete", 1), ("bucket_end", 1)])
+        self.metrics = metrics
+        self.watermark_delay = _parse_duration(WATERMARK)
+        self.max_event_time = None
+
+    def __call__(self, batch_df, batch_id):
+        start = time.perf_counter()
+        rows = batch_df.collect()
+        if not rows:
+            return
+        batch_max = max(row["last_ts"] for row in rows)
+        if self.max_event_time is None or batch_max > self.max_event_time:
+            self.max_event_time = batch_max
+        watermark = self.max_event_time - self.watermark_delay
+
+        now = datetime.now()
+        with BulkWriter(self.collection) as writer:
+            for row in rows:
+                doc = row.asDict()
+                doc.update({
+                    "timeframe": self.timeframe,
+                    "complete": doc["bucket_end"] <= watermark,
+                    "source": "stream",
+                    "updated_at": now,
+                })
+                writer.update({"ticker": doc["ticker"], "date": doc["date"]}, {"$set": doc}, upsert=True)
+
+        # Mode update hanya mengirim bucket yang berubah, jadi bucket yang sudah lewat watermark
+        # tidak akan muncul lagi di batch berikutnya; tandai final di sini
+        finalized = self.collection.update_many(
+            {"bucket_end": {"$lte": watermark}, "complete": False},
+            {"$set": {"complete": True, "updated_at": now}},
+        ).modified_count
+
+        get_db(DB_NAME)["pipeline_meta"].update_one(
+            {"_id": INTRADAY_WRITE_ID},
+            {"$set": {"updated_at": now, "ticker": rows[-1]["ticker"], "timeframe": self.timeframe}},
+            upsert=True,
+        )
+        elapsed = time.perf_counter() - start
+        self.metrics.observe("stage_seconds", elapsed, stage="upsert", status="ok", timeframe=self.timeframe)
+        self.metrics.count("buckets_upserted_total", len(rows), timeframe=self.timeframe)
+        self.metrics.count("buckets_finalized_total", finalized, timeframe=self.timeframe)
+        self.metrics.flush()
+        print(f"💾 [{self.timeframe}] batch {batch_id}: {len(rows)} bucket di-upsert, {finalized} final "
+              f"(watermark {watermark:%Y-%m-%d %H:%M})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agregasi bar intraday IDX dengan Spark Structured Streaming")
+    parser.add_argument("--source", default="file", choices=["file", "socket"])
+    parser.add_argument("--path", default="incoming_ticks", help="Folder CSV untuk sumber file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--input-kind", default="ticks", choices=["ticks", "bars"])
+    parser.add_argument("--timeframes", default=",".join(TIMEFRAMES), help="Mis. 5m,15m,1h,daily")
+    parser.add_argument("--trigger", default="10 seconds", help="Interval micro-batch")
+    parser.add_argument("--max-files-per-trigger", type=int, default=50)
+    parser.add_argument("--checkpoint-dir", default=os.path.join(REPO_DIR, "checkpoints", "intraday"))
+    args = parser.parse_args()
+
+    timeframes = args.timeframes.split(",")
+    unknown = [tf for tf in timeframes if tf not in TIMEFRAMES]
+    if unknown:
+        raise SystemExit(f"❌ Timeframe tidak dikenal: {', '.join(unknown)}")
+    if args.source == "socket" and len(timeframes) > 1:
+        raise SystemExit("❌ Sumber socket hanya mendukung satu timeframe per proses (mis. --timeframes 5m)")
+
+    metrics = get_metrics("stream_intraday")
+    spark = create_spark_session("IntradayBarsStream")
+    bars = read_source(spark, args)
+
+    # Satu streaming query per timeframe, masing-masing dengan state dan checkpoint sendiri
+    queries = []
+    for timeframe in timeframes:
+        query = aggregate_bars(bars, timeframe).writeStream \
+            .outputMode("update") \
+            .foreachBatch(BucketWriter(timeframe, metrics)) \
+            .option("checkpointLocation", os.path.join(args.checkpoint_dir, timeframe)) \
+            .trigger(processingTime=args.trigger) \
+            .queryName(f"intraday_{timeframe}") \
+            .start()
+        queries.append(query)
+        print(f"🚀 Streaming {timeframe} dimulai -> {TIMEFRAMES[timeframe]['collection']}")
+
+    try:
+        spark.streams.awaitAnyTermination()
+    except KeyboardInterrupt:
+        print("\n🛑 Streaming dihentikan")
+    finally:
+        for query in queries:
+            query.stop()
+        metrics.print_summary()
+        metrics.flush()
+        spark.stop()
+
+
+if __name__ == "__main__":
+    main()